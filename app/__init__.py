@@ -1,11 +1,21 @@
 from __future__ import annotations
 
 import os
+
+import click
 from flask import Flask
 
-from .extensions import db, login_manager, migrate, csrf
+from .assets import init_assets
+from .cli import santa_cli
+from .engine_profiles import configure_engines, init_engine_profiles
+from .extensions import db, login_manager, csrf, init_migrate
+from .metrics import init_metrics
+from .query_budget import init_query_budgets
+from .replicas import init_replicas
 from .models import AssignmentState
 from .policies import is_admin_user
+from .startup import warmup
+from .tenancy import current_event, init_tenancy
 from .views.auth import auth_bp
 from .views.santa import santa_bp
 from .views.public import public_bp
@@ -17,14 +27,78 @@ def create_app() -> Flask:
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-change-me")
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///secretsanta.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["TEMPLATES_AUTO_RELOAD"] = True
+
+    # Optional read replicas (comma-separated URLs; see replicas.py). A session
+    # that wrote reads from the primary for SANTA_REPLICA_RYW_SECONDS after.
+    app.config["SANTA_REPLICA_URLS"] = os.environ.get("DATABASE_REPLICA_URLS", "")
+    app.config["SANTA_REPLICA_RYW_SECONDS"] = float(os.environ.get("SANTA_REPLICA_RYW_SECONDS", "10"))
+
+    # Per-dialect engine presets (see engine_profiles.py): tuned | defaults.
+    # One gunicorn worker serves GUNICORN_THREADS requests at a time; +1 for a
+    # run's snapshot connection.
+    app.config["SANTA_DB_PROFILE"] = os.environ.get("SANTA_DB_PROFILE", "tuned").strip().lower()
+    app.config["SANTA_DB_POOL_SIZE"] = int(
+        os.environ.get("SANTA_DB_POOL_SIZE") or int(os.environ.get("GUNICORN_THREADS", "1")) + 1
+    )
+    app.config["SANTA_DB_MAX_OVERFLOW"] = int(os.environ.get("SANTA_DB_MAX_OVERFLOW", "2"))
+    # SQLite: how long a writer waits for the lock (pysqlite's own default is 5s).
+    app.config["SANTA_DB_BUSY_TIMEOUT_MS"] = int(os.environ.get("SANTA_DB_BUSY_TIMEOUT_MS", "15000"))
+
+    # "production" is the gunicorn deploy: no per-render template stat(),
+    # templates compiled and crypto primed at boot.
+    app.config["SANTA_PROFILE"] = os.environ.get("SANTA_PROFILE", "development").strip().lower()
+    production = app.config["SANTA_PROFILE"] == "production"
+    running_cli = click.get_current_context(silent=True) is not None
+    app.config["TEMPLATES_AUTO_RELOAD"] = not production
+
+    # Postgres only; CLI commands (imports, batch runs) are exempt: they hold a
+    # transaction open across long CPU work. 0 = no limit.
+    app.config["SANTA_DB_STATEMENT_TIMEOUT_MS"] = int(
+        os.environ.get("SANTA_DB_STATEMENT_TIMEOUT_MS") or (0 if running_cli else 15000)
+    )
+    app.config["SANTA_DB_IDLE_IN_TRANSACTION_TIMEOUT_MS"] = int(
+        os.environ.get("SANTA_DB_IDLE_IN_TRANSACTION_TIMEOUT_MS") or (0 if running_cli else 60000)
+    )
 
     # Admin is the participant whose name matches this exactly
     app.config["SANTA_ADMIN_NAME"] = os.environ.get("SANTA_ADMIN_NAME", "").strip()
 
+    # Event served when neither the session nor ?event= picks one (see tenancy.py)
+    app.config["SANTA_DEFAULT_EVENT"] = os.environ.get("SANTA_DEFAULT_EVENT", "default").strip().lower()
+
+    # Lets a Prometheus scraper read /metrics without an admin session
+    app.config["SANTA_METRICS_TOKEN"] = os.environ.get("SANTA_METRICS_TOKEN", "")
+
+    # Per-view SQL budgets + N+1 detection (see query_budget.py): off | warn | raise
+    app.config["SANTA_QUERY_BUDGETS"] = os.environ.get("SANTA_QUERY_BUDGETS", "off" if production else "warn")
+    app.config["SANTA_QUERY_REPEAT_LIMIT"] = int(os.environ.get("SANTA_QUERY_REPEAT_LIMIT", "3"))
+
+    # Assignment-ready emails (services/notifications.py); off unless SMTP_HOST is set.
+    # SMTP_SECURITY: starttls | ssl | none
+    app.config["SMTP_HOST"] = os.environ.get("SMTP_HOST", "")
+    app.config["SMTP_PORT"] = int(os.environ.get("SMTP_PORT", "587"))
+    app.config["SMTP_SECURITY"] = os.environ.get("SMTP_SECURITY", "starttls").strip().lower()
+    app.config["SMTP_USERNAME"] = os.environ.get("SMTP_USERNAME", "")
+    app.config["SMTP_PASSWORD"] = os.environ.get("SMTP_PASSWORD", "")
+    app.config["SMTP_FROM"] = os.environ.get("SMTP_FROM", "secret-santa@localhost")
+    app.config["SANTA_BASE_URL"] = os.environ.get("SANTA_BASE_URL", "http://localhost:5000")
+    app.config["SANTA_NOTIFY_RATE"] = float(os.environ.get("SANTA_NOTIFY_RATE", "5"))  # messages/second
+    app.config["SANTA_NOTIFY_CONNECTIONS"] = int(os.environ.get("SANTA_NOTIFY_CONNECTIONS", "2"))
+    app.config["SANTA_NOTIFY_MAX_ATTEMPTS"] = int(os.environ.get("SANTA_NOTIFY_MAX_ATTEMPTS", "5"))
+
+    # Mixed into ETags so a deploy (new templates) invalidates every cached page
+    app.config["SANTA_CACHE_SALT"] = os.environ.get("SANTA_CACHE_SALT") or os.environ.get("RENDER_GIT_COMMIT", "")
+
+    init_replicas(app)  # adds the replica binds, so before db.init_app
+    configure_engines(app)
     db.init_app(app)
+    init_engine_profiles(app)
+    init_tenancy(app)
+    init_metrics(app)
+    init_query_budgets(app)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
+    if running_cli or not production:
+        init_migrate(app)
     csrf.init_app(app)
     login_manager.login_view = "auth.login"
 
@@ -32,16 +106,23 @@ def create_app() -> Flask:
     app.register_blueprint(public_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(santa_bp)
+    init_assets(app)
+
+    app.cli.add_command(santa_cli)
 
     # Global template vars (used to hide register when locked if you want)
     @app.context_processor
     def inject_global_state():
         state = AssignmentState.get_singleton()
         return {
+            "current_event": current_event(),
             "registration_closed": state.is_locked,
             "assignment_run_at": state.run_at,
             "is_admin": is_admin_user(),
         }
 
+    if production and not running_cli:
+        warmup(app)
+
     return app
 
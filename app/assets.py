@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+from pathlib import Path
+
+from flask import Blueprint, Flask, abort, current_app, request, send_file, url_for
+
+
+# ---------------------------------------------------------------------------
+# Static asset pipeline
+#
+# `flask santa build-assets` turns the sources below into a flat directory of
+# fingerprinted files (name.<hash>.ext) plus .br/.gz siblings and a manifest:
+#   - SleighVF.ttf is subset to the glyphs the titlebar can use and re-encoded
+#     as WOFF2 (~185KB -> ~40KB).
+#   - Google Fonts (Asul) and Bootstrap are vendored, so a cold page load needs
+#     no third-party DNS/TLS round trips.
+#   - Asul + Bootstrap + santa.css are bundled into one minified stylesheet.
+#
+# Fingerprinted files never change, so /assets/* is served with a one-year
+# `immutable` cache. Without a build (local dev) templates fall back to CDNs.
+# ---------------------------------------------------------------------------
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+
+BOOTSTRAP_CSS = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH",
+)
+BOOTSTRAP_JS = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+    "sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz",
+)
+GOOGLE_FONTS_CSS = "https://fonts.googleapis.com/css2?family=Asul:wght@400;700&display=swap"
+# Google serves WOFF2 only to browsers it recognises.
+_WOFF2_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Sleigh is only used for the titlebar brand: printable ASCII + typographic quotes.
+SLEIGH_UNICODES = list(range(0x20, 0x7F)) + [0x2018, 0x2019, 0x201C, 0x201D, 0x2026]
+
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetBuildError(RuntimeError):
+    pass
+
+
+# --------- Build ----------
+
+def _fetch(url: str, integrity: str | None = None, user_agent: str | None = None) -> bytes:
+    req = urllib.request.Request(url, headers={"User-Agent": user_agent or "secret-santinator-build"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            body = resp.read()
+    except OSError as e:
+        raise AssetBuildError(f"Could not fetch {url}: {e}") from e
+    if integrity:
+        algo, _, expected = integrity.partition("-")
+        actual = base64.b64encode(hashlib.new(algo, body).digest()).decode("ascii")
+        if actual != expected:
+            raise AssetBuildError(f"Integrity mismatch for {url}")
+    return body
+
+
+def _fingerprint(logical: str, data: bytes) -> str:
+    """fonts/SleighVF.woff2 -> SleighVF.<hash>.woff2 (flat output dir)."""
+    stem, ext = os.path.splitext(os.path.basename(logical))
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f"{stem}.{digest}{ext}"
+
+
+def _subset_font_woff2(ttf_path: Path) -> bytes:
+    # Build-time only dependency; keep it out of the web worker import path.
+    from fontTools import subset
+    from io import BytesIO
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+
+    font = subset.load_font(str(ttf_path), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=SLEIGH_UNICODES)
+    subsetter.subset(font)
+
+    buf = BytesIO()
+    subset.save_font(font, buf, options)
+    return buf.getvalue()
+
+
+def minify_css(css: str) -> str:
+    """Conservative minifier for hand-written CSS (comments + whitespace only)."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)(\s*format\(\s*['"][^'"]+['"]\s*\))?""")
+
+
+def build_assets(out_dir: Path = DIST_DIR, precompress: bool = True) -> dict[str, str]:
+    """
+    Builds fingerprinted assets into out_dir and writes manifest.json.
+    Returns the manifest: logical name -> fingerprinted file name.
+    """
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+
+    manifest: dict[str, str] = {}
+
+    def emit(logical: str, data: bytes) -> str:
+        name = _fingerprint(logical, data)
+        (out_dir / name).write_bytes(data)
+        manifest[logical] = name
+        return name
+
+    # 1) Sleigh: subset + WOFF2
+    sleigh = emit("fonts/SleighVF.woff2", _subset_font_woff2(STATIC_DIR / "fonts" / "SleighVF.ttf"))
+
+    # 2) Asul from Google Fonts, re-pointed at local copies
+    asul_css = _fetch(GOOGLE_FONTS_CSS, user_agent=_WOFF2_USER_AGENT).decode("utf-8")
+
+    def _vendor_font(match: re.Match) -> str:
+        url = match.group(2)
+        name = emit(f"fonts/{os.path.basename(url)}", _fetch(url))
+        return f'url("{name}") format("woff2")'
+
+    asul_css = _CSS_URL_RE.sub(_vendor_font, asul_css)
+
+    # 3) App stylesheet: swap the TTF for the subset WOFF2
+    santa_css = (STATIC_DIR / "css" / "santa.css").read_text("utf-8")
+    santa_css = _CSS_URL_RE.sub(
+        lambda m: f'url("{sleigh}") format("woff2")' if m.group(2).endswith("SleighVF.ttf") else m.group(0),
+        santa_css,
+    )
+
+    # 4) One stylesheet: vendored CSS is already minified, ours gets minified here.
+    bootstrap_css = _fetch(*BOOTSTRAP_CSS).decode("utf-8")
+    bundle = "\n".join([minify_css(asul_css), bootstrap_css, minify_css(santa_css)])
+    emit("css/app.css", bundle.encode("utf-8"))
+
+    emit("js/bootstrap.bundle.min.js", _fetch(*BOOTSTRAP_JS))
+
+    if precompress:
+        for name in list(manifest.values()):
+            _precompress(out_dir / name)
+
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True), "utf-8")
+    return manifest
+
+
+def _precompress(path: Path) -> None:
+    if path.suffix not in COMPRESSIBLE_SUFFIXES:
+        # WOFF2 is already Brotli-compressed internally.
+        return
+    data = path.read_bytes()
+    # mtime=0 keeps the .gz byte-identical across builds.
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+# --------- Runtime ----------
+
+assets_bp = Blueprint("assets", __name__, url_prefix="/assets")
+
+# Order is preference when the client accepts several encodings.
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@assets_bp.route("/<path:filename>")
+def asset(filename: str):
+    manifest = current_app.extensions.get("santa_assets") or {}
+    if filename not in manifest.values():
+        abort(404)
+
+    path = DIST_DIR / filename
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    encoding = None
+    for enc, suffix in _ENCODINGS:
+        if request.accept_encodings[enc] and path.with_name(path.name + suffix).is_file():
+            encoding, path = enc, path.with_name(path.name + suffix)
+            break
+
+    response = send_file(path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, conditional=True, etag=True)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def load_manifest() -> dict[str, str]:
+    try:
+        return json.loads((DIST_DIR / MANIFEST_NAME).read_text("utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def manifest_digest(manifest: dict[str, str]) -> str:
+    """Changes whenever a rebuild renames any fingerprinted file."""
+    if not manifest:
+        return ""
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def init_assets(app: Flask) -> None:
+    manifest = load_manifest()
+    app.extensions["santa_assets"] = manifest
+    # Mixed into ETags (http_cache.py): pages name the fingerprinted files.
+    app.config["SANTA_ASSETS_DIGEST"] = manifest_digest(manifest)
+    app.register_blueprint(assets_bp)
+
+    def asset_url(logical: str) -> str:
+        name = manifest.get(logical)
+        if name:
+            return url_for("assets.asset", filename=name)
+        return url_for("static", filename=logical)
+
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.jinja_env.globals["assets_built"] = bool(manifest)
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import csv
+
+import click
+from flask.cli import AppGroup
+
+
+santa_cli = AppGroup("santa", help="Secret Santa maintenance commands.")
+
+event_option = click.option(
+    "--event", "event_slug", help="Event slug (default: SANTA_DEFAULT_EVENT)."
+)
+
+
+def _use_event(slug: str | None) -> int:
+    """Scope the command to an event; returns its id."""
+    from .tenancy import current_event_id, event_by_slug, use_event
+
+    if slug:
+        info = event_by_slug(slug)
+        if info is None:
+            raise click.ClickException(f"No event {slug!r}; create it with `flask santa create-event`.")
+        use_event(info)
+    return current_event_id()
+
+
+@santa_cli.command("build-assets")
+@click.option("--no-precompress", is_flag=True, help="Skip writing .br/.gz variants.")
+def build_assets_command(no_precompress: bool) -> None:
+    """Subset fonts, vendor CSS/JS, fingerprint and precompress into static/dist."""
+    from .assets import build_assets, AssetBuildError, DIST_DIR
+
+    try:
+        manifest = build_assets(precompress=not no_precompress)
+    except AssetBuildError as e:
+        raise click.ClickException(str(e)) from e
+    for logical, name in sorted(manifest.items()):
+        size = (DIST_DIR / name).stat().st_size
+        click.echo(f"{logical:32} -> {name} ({size / 1024:.1f} KiB)")
+
+
+@santa_cli.command("bench-startup")
+@click.option("--runs", default=5, show_default=True, help="Fresh interpreters to boot.")
+@click.option("--budget-ms", default=1500.0, show_default=True, help="Fail if the median boot exceeds this.")
+@click.option("--profile", default="production", show_default=True, help="SANTA_PROFILE to boot with.")
+def bench_startup_command(runs: int, budget_ms: float, profile: str) -> None:
+    """Time create_app() from a cold interpreter and enforce a boot budget."""
+    from .startup import measure_boot, boot_summary
+
+    summary = boot_summary(measure_boot(runs=runs, profile=profile))
+    click.echo(
+        f"boot ({profile}, {runs} runs): "
+        f"min {summary['min']:.0f}ms · median {summary['median']:.0f}ms · max {summary['max']:.0f}ms "
+        f"(budget {budget_ms:.0f}ms)"
+    )
+    if summary["median"] > budget_ms:
+        raise click.ClickException(f"Boot time regressed: median {summary['median']:.0f}ms > {budget_ms:.0f}ms")
+
+
+@santa_cli.command("bench-db")
+@click.option("--threads", default=8, show_default=True, help="Concurrent clients.")
+@click.option("--seconds", default=5.0, show_default=True, help="Duration per profile.")
+@click.option("--write-ratio", default=0.2, show_default=True, help="Share of preference saves vs dashboard reads.")
+@click.option("--url", help="Postgres URL to bench in a scratch schema (default: temporary SQLite files).")
+def bench_db_command(threads: int, seconds: float, write_ratio: float, url: str | None) -> None:
+    """Concurrent read/write throughput with SQLAlchemy defaults vs the tuned engine profile."""
+    from flask import current_app
+    from sqlalchemy.exc import OperationalError
+
+    from .engine_profiles import bench_concurrency
+
+    try:
+        results = bench_concurrency(current_app.config, url, threads=threads, seconds=seconds, write_ratio=write_ratio)
+    except (ValueError, OperationalError) as e:
+        raise click.ClickException(str(e)) from e
+    for r in results:
+        click.echo(
+            f"{r.profile:9} {r.throughput:8.0f} ops/s  ({r.writes} writes, {r.reads} reads)  "
+            f"p95 {r.p95_ms:6.1f}ms  {r.errors} errors"
+        )
+    baseline, tuned = results
+    if baseline.throughput:
+        click.echo(f"tuned/defaults: {tuned.throughput / baseline.throughput:.2f}x")
+
+
+@santa_cli.command("create-event")
+@click.argument("slug")
+@click.option("--name", help="Display name (default: the slug).")
+def create_event_command(slug: str, name: str | None) -> None:
+    """Add an event; share /e/SLUG with its participants."""
+    from .services.events import EventError, create_event
+
+    try:
+        event = create_event(slug, name)
+    except EventError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Created event {event.slug!r} ({event.name}); landing page: /e/{event.slug}")
+
+
+@santa_cli.command("list-events")
+def list_events_command() -> None:
+    """Every event with its participant count."""
+    from .replicas import use_replica
+    from .services.events import list_events
+
+    with use_replica():
+        events = list_events()
+    for event, participants in events:
+        click.echo(f"{event.slug:32} {participants:6} participants  {event.name}")
+
+
+@santa_cli.command("run-pending")
+@click.option("--event", "slugs", multiple=True, help="Only these event slugs (repeatable; default: every unlocked event).")
+@click.option("--workers", type=int, help="Solver processes (default: CPU count).")
+@click.option("--max-steps", default=None, type=int, help="Backtracking budget per pool before giving up.")
+def run_pending_command(slugs: tuple[str, ...], workers: int | None, max_steps: int | None) -> None:
+    """Run and lock assignments for every unlocked event, in parallel."""
+    from .services.assignments import MAX_SEARCH_STEPS, run_pending_assignments
+
+    def report(result) -> None:
+        line = f"  {result.status:8} {result.slug:32} {result.participants:6} people  {result.seconds * 1000:7.0f}ms"
+        click.echo(f"{line}  {result.message}" if result.message else line)
+
+    results = run_pending_assignments(
+        slugs or None, workers=workers, max_steps=max_steps or MAX_SEARCH_STEPS, on_result=report
+    )
+    counts = {status: sum(r.status == status for r in results) for status in ("assigned", "skipped", "failed")}
+    click.echo(f"{len(results)} events: {counts['assigned']} assigned, {counts['skipped']} skipped, {counts['failed']} failed.")
+    if counts["failed"]:
+        raise click.ClickException(f"{counts['failed']} event(s) could not be assigned.")
+
+
+# --------- Admin actions (the web admin only exists in the default event) ----------
+
+@santa_cli.command("unlock")
+@event_option
+def unlock_command(event_slug: str | None) -> None:
+    """Unset and unlock an event's assignments (rerun with `run-pending --event`)."""
+    from .services.assignments import unset_and_unlock_assignments
+
+    unset_and_unlock_assignments(_use_event(event_slug))
+    click.echo("Assignments unset and unlocked.")
+
+
+@santa_cli.command("pending-resets")
+@event_option
+def pending_resets_command(event_slug: str | None) -> None:
+    """Participants who asked for a passphrase reset."""
+    from .services.roster import pending_resets_page
+
+    event_id = _use_event(event_slug)
+    after = None
+    while True:
+        rows, after = pending_resets_page(event_id, after=after)
+        for row in rows:
+            click.echo(row.name)
+        if after is None:
+            return
+
+
+@santa_cli.command("reset-passphrase")
+@click.argument("name")
+@click.option("--passphrase", prompt="Temporary passphrase", hide_input=True, confirmation_prompt=True,
+              help="Temporary passphrase to give them (prompted if omitted).")
+@event_option
+def reset_passphrase_command(name: str, passphrase: str, event_slug: str | None) -> None:
+    """Set a temporary passphrase; they must change it on first login."""
+    from .services.imports import client_hash_for_passphrase
+    from .services.participants import ParticipantNotFound, participant_by_name, reset_passphrase
+
+    if not passphrase.strip():
+        raise click.ClickException("The passphrase can't be empty.")
+    try:
+        p = participant_by_name(_use_event(event_slug), name)
+    except ParticipantNotFound as e:
+        raise click.ClickException(str(e)) from e
+    reset_passphrase(p, client_hash_for_passphrase(passphrase))
+    click.echo(f"Temporary passphrase set for {p.name}. They must change it on first login.")
+
+
+@santa_cli.command("remove-participant")
+@click.argument("name")
+@click.option("--yes", is_flag=True, help="Don't ask for confirmation.")
+@event_option
+def remove_participant_command(name: str, yes: bool, event_slug: str | None) -> None:
+    """Delete a participant and their exclusions (unsets locked assignments)."""
+    from .services.participants import ParticipantNotFound, participant_by_name, remove_participant
+
+    try:
+        p = participant_by_name(_use_event(event_slug), name)
+    except ParticipantNotFound as e:
+        raise click.ClickException(str(e)) from e
+    if not yes:
+        click.confirm(f"Delete {p.name} and their exclusions?", abort=True)
+    if remove_participant(p):
+        click.echo("Assignments were locked; they have been unset and unlocked.")
+    click.echo(f"Deleted participant: {name}")
+
+
+@santa_cli.command("send-notifications")
+@click.option("--once", is_flag=True, help="Drain what is due now and exit (default: keep polling).")
+@click.option("--batch-size", default=100, show_default=True, help="Rows claimed per batch.")
+@click.option("--rate", type=float, help="Messages per second (default: SANTA_NOTIFY_RATE; 0 = unthrottled).")
+@click.option("--connections", type=int, help="Concurrent SMTP connections (default: SANTA_NOTIFY_CONNECTIONS).")
+@click.option("--idle", default=5.0, show_default=True, help="Seconds to sleep when the outbox is empty.")
+def send_notifications_command(once: bool, batch_size: int, rate: float | None, connections: int | None, idle: float) -> None:
+    """Deliver queued emails (run as its own process, not in a web worker)."""
+    from .services.notifications import notifications_enabled, run_sender
+
+    if not notifications_enabled():
+        raise click.ClickException("SMTP_HOST is not set.")
+
+    def progress(report) -> None:
+        click.echo(f"  batch: {report.sent} sent · {report.retried} to retry · {report.failed} failed", err=True)
+
+    try:
+        total = run_sender(batch_size, once=once, idle_seconds=idle, rate=rate, connections=connections, on_batch=progress)
+    except KeyboardInterrupt:
+        return
+    click.echo(f"{total.sent} sent, {total.retried} to retry, {total.failed} failed.")
+
+
+@santa_cli.command("notification-status")
+@event_option
+def notification_status_command(event_slug: str | None) -> None:
+    """Delivery counts by status (all events unless --event)."""
+    from .services.notifications import notification_counts
+
+    counts = notification_counts(_use_event(event_slug) if event_slug else None)
+    for status in ("pending", "sending", "sent", "failed", "cancelled"):
+        click.echo(f"{status:10} {counts.get(status, 0)}")
+
+
+@santa_cli.command("snapshot")
+@click.argument("dest", type=click.File("wb"), default="-")
+def snapshot_command(dest) -> None:
+    """Write every event (participants, exclusions, state, outbox) to a compressed archive."""
+    from .services.snapshots import write_snapshot
+
+    report = write_snapshot(dest, on_table=lambda name, n: click.echo(f"  {name:18} {n:8} rows", err=True))
+    click.echo(f"Snapshot: {report.rows} rows in {report.seconds:.1f}s ({report.rate:.0f}/s).", err=True)
+
+
+@santa_cli.command("restore")
+@click.argument("source", type=click.File("rb"))
+def restore_command(source) -> None:
+    """Load a snapshot into an empty, migrated database (ids and ciphertexts kept)."""
+    from .services.snapshots import SnapshotError, restore_snapshot
+
+    try:
+        report = restore_snapshot(source, on_table=lambda name, n: click.echo(f"  {name:18} {n:8} rows", err=True))
+    except SnapshotError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Restored {report.rows} rows in {report.seconds:.1f}s ({report.rate:.0f}/s).")
+    click.echo("Restart the web service if it is already running on this database (it caches event ids).", err=True)
+
+
+@santa_cli.command("import-participants")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults from the file extension.")
+@click.option("--chunk-size", default=500, show_default=True, help="Records per duplicate check / INSERT batch.")
+@click.option("--workers", type=int, help="Hashing processes (default: CPU count).")
+@event_option
+def import_participants_command(source, fmt: str | None, chunk_size: int, workers: int | None, event_slug: str | None) -> None:
+    """
+    Bulk-register participants from CSV/JSONL (name, email, client_hash or passphrase).
+    Imported accounts must change their passphrase on first login.
+    """
+    from .services.imports import ParticipantImportError, detect_format, import_participants, iter_records
+
+    def progress(report) -> None:
+        click.echo(f"  {report.read} read · {report.inserted} inserted · {report.rate:.0f}/s", err=True)
+
+    event_id = _use_event(event_slug)
+    try:
+        report = import_participants(
+            event_id,
+            iter_records(source, fmt or detect_format(source.name)),
+            chunk_size=chunk_size,
+            workers=workers,
+            on_chunk=progress,
+        )
+    except ParticipantImportError as e:
+        raise click.ClickException(str(e)) from e
+
+    for err in report.errors[:20]:
+        click.echo(f"  skipped {err}", err=True)
+    click.echo(
+        f"Imported {report.inserted} participants in {report.seconds:.1f}s ({report.rate:.1f}/s); "
+        f"skipped {report.existing} already registered, {report.duplicates} duplicates, {report.invalid} invalid."
+    )
+
+
+@santa_cli.command("import-exclusions")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults from the file extension.")
+@click.option("--chunk-size", default=5000, show_default=True, help="Rows per INSERT batch.")
+@event_option
+def import_exclusions_command(source, fmt: str | None, chunk_size: int, event_slug: str | None) -> None:
+    """Load giver/receiver exclusions by name; existing pairs are skipped."""
+    from .services.exclusions import ExclusionImportError, import_exclusions
+    from .services.imports import detect_format, iter_records
+
+    event_id = _use_event(event_slug)
+    try:
+        report = import_exclusions(
+            event_id, iter_records(source, fmt or detect_format(source.name)), chunk_size=chunk_size
+        )
+    except (ExclusionImportError, ValueError, csv.Error) as e:
+        raise click.ClickException(f"Exclusion import stopped: {e}") from e
+
+    for err in report.errors[:20]:
+        click.echo(f"  skipped {err}", err=True)
+    click.echo(
+        f"Read {report.read} rows in {report.seconds:.1f}s ({report.rate:.0f}/s): {report.inserted} inserted, "
+        f"{report.existing} already present, {report.unknown} unknown names, {report.invalid} invalid."
+    )
+
+
+@santa_cli.command("export-exclusions")
+@click.argument("dest", type=click.File("w", encoding="utf-8"), default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+@event_option
+def export_exclusions_command(dest, fmt: str, event_slug: str | None) -> None:
+    """Stream every exclusion of an event (giver/receiver names) to DEST or stdout."""
+    from .replicas import use_replica
+    from .services.exclusions import export_exclusions
+
+    event_id = _use_event(event_slug)
+    with use_replica():
+        for piece in export_exclusions(event_id, fmt):
+            dest.write(piece)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy.engine import Connection
+
+from .extensions import db
+from .models import AssignmentState
+
+
+# ---------------------------------------------------------------------------
+# Run coordination
+#
+# Any number of workers can serve an event; correctness rests on the event's
+# AssignmentState row rather than on running one process:
+#
+#   read   graph_snapshot(): the state version, participants and exclusions
+#          come from one consistent snapshot on a separate read-only
+#          connection (REPEATABLE READ on Postgres, a read transaction on
+#          SQLite), so a run never sees half of a concurrent write.
+#   solve  outside any transaction or lock.
+#   commit lock_event_for_write() + a compare-and-swap on the version:
+#          UPDATE ... WHERE version = <snapshot version> AND NOT is_locked.
+#          Zero rows means something changed since the snapshot, and the run
+#          is refused instead of overwriting it.
+#
+# Every write that changes what a run reads (registration, deletion,
+# preferences, imports) bumps the version in its own transaction, and
+# preference saves use the same lock + "only while unlocked" guard. The lock
+# is a Postgres transaction-scoped advisory lock keyed on the event (or
+# SQLite's BEGIN IMMEDIATE). It is held only for these short commit phases,
+# so runs in different events, and reads in the same one, never wait on it.
+# ---------------------------------------------------------------------------
+
+# First key of the two-int advisory lock; the second is the event id.
+ADVISORY_LOCK_NAMESPACE = 0x5A17A
+
+
+class StateChanged(RuntimeError):
+    """The event was locked or modified since the caller last read it."""
+
+
+@contextmanager
+def graph_snapshot() -> Iterator[Connection]:
+    """Read-only connection whose queries all see one snapshot."""
+    with db.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        elif conn.dialect.name == "sqlite":
+            # pysqlite only opens transactions for writes; make the reads share one.
+            conn.exec_driver_sql("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
+def begin_write() -> None:
+    """
+    SQLite: take the database write lock now (BEGIN IMMEDIATE) so a
+    read-then-write in this transaction can't be overtaken. SQLite has one
+    writer at a time anyway. No-op on other databases.
+    """
+    conn = db.session.connection()
+    if conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def lock_event_for_write(event_id: int) -> None:
+    """Serialise commit phases for one event until the session's transaction ends."""
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            db.text("SELECT pg_advisory_xact_lock(:namespace, :event_id)"),
+            {"namespace": ADVISORY_LOCK_NAMESPACE, "event_id": event_id},
+        )
+    else:
+        begin_write()
+
+
+def claim_unlocked(event_id: int, expected_version: int | None = None, **values) -> None:
+    """
+    Conditional UPDATE of the event's state: bumps the version (plus any
+    `values`) only while unlocked and, if given, still at `expected_version`.
+    Raises StateChanged otherwise. Runs in the session's transaction.
+    """
+    state = AssignmentState.__table__
+    stmt = (
+        db.update(state)
+        .where(state.c.event_id == event_id, state.c.is_locked.is_(False))
+        .values(version=state.c.version + 1, changed_at=datetime.utcnow(), **values)
+    )
+    if expected_version is not None:
+        stmt = stmt.where(state.c.version == expected_version)
+    if db.session.execute(stmt).rowcount != 1:
+        db.session.rollback()
+        raise StateChanged(f"Event {event_id} was locked or changed concurrently.")
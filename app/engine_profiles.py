@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import Flask
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+
+
+# ---------------------------------------------------------------------------
+# Engine profiles
+#
+# SQLAlchemy's defaults suit neither database we run on. Every engine (the
+# primary and each replica bind) gets the preset for its dialect:
+#
+#   sqlite      WAL journal (readers no longer block the writer and vice
+#               versa), synchronous=NORMAL (no fsync per commit; still safe
+#               with WAL), and a longer busy timeout (15s instead of
+#               pysqlite's 5s) before a writer gives up with "database is
+#               locked".
+#   postgresql  a pool sized to the gunicorn worker's threads (+1 for the
+#               snapshot connection a run opens next to the session's),
+#               pre-ping and recycling (the free-tier database sleeps and drops
+#               idle connections), TCP keepalives, and statement and
+#               idle-in-transaction timeouts for web requests (both off for CLI
+#               commands, which hold transactions across long CPU work).
+#
+# SANTA_DB_PROFILE=defaults turns all of it off (escape hatch, and the
+# baseline `flask santa bench-db` compares against).
+# ---------------------------------------------------------------------------
+
+PROFILES = {"tuned", "defaults"}
+
+SQLITE_PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL"}
+PG_KEEPALIVES = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 3}
+PG_LIBPQ_DRIVERS = {"psycopg2", "psycopg"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    postgres:// (Heroku-style) is rejected by SQLAlchemy 1.4+, and a bare
+    postgresql:// means psycopg 3 from SQLAlchemy 2.1 on; we ship psycopg2.
+    """
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg2://" + url[len(prefix):]
+    return url
+
+
+def engine_options(url: str, config) -> dict:
+    """create_engine() keyword arguments for `url` under the configured profile."""
+    if config["SANTA_DB_PROFILE"] == "defaults":
+        return {}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {"connect_args": {"timeout": config["SANTA_DB_BUSY_TIMEOUT_MS"] / 1000}}
+    if parsed.get_backend_name() != "postgresql":
+        return {"pool_pre_ping": True}
+
+    options = {
+        "pool_size": config["SANTA_DB_POOL_SIZE"],
+        "max_overflow": config["SANTA_DB_MAX_OVERFLOW"],
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+    if parsed.get_driver_name() in PG_LIBPQ_DRIVERS:
+        server_options = []
+        if config["SANTA_DB_STATEMENT_TIMEOUT_MS"]:
+            server_options.append(f"-c statement_timeout={config['SANTA_DB_STATEMENT_TIMEOUT_MS']}")
+        if config["SANTA_DB_IDLE_IN_TRANSACTION_TIMEOUT_MS"]:
+            server_options.append(
+                f"-c idle_in_transaction_session_timeout={config['SANTA_DB_IDLE_IN_TRANSACTION_TIMEOUT_MS']}"
+            )
+        options["connect_args"] = {"connect_timeout": 10, "application_name": "secret-santa", **PG_KEEPALIVES}
+        if server_options:
+            options["connect_args"]["options"] = " ".join(server_options)
+    return options
+
+
+def _sqlite_on_connect(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def tune_engine(engine: Engine, profile: str) -> None:
+    """Per-connection settings that can't be passed to create_engine()."""
+    if profile == "tuned" and engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        if not event.contains(engine, "connect", _sqlite_on_connect):
+            event.listen(engine, "connect", _sqlite_on_connect)
+
+
+def configure_engines(app: Flask) -> None:
+    """Before db.init_app: normalise URLs and set options for the primary and every bind."""
+    config = app.config
+    if config["SANTA_DB_PROFILE"] not in PROFILES:
+        raise ValueError(f"SANTA_DB_PROFILE must be one of {sorted(PROFILES)}, got {config['SANTA_DB_PROFILE']!r}")
+    config["SQLALCHEMY_DATABASE_URI"] = normalize_url(config["SQLALCHEMY_DATABASE_URI"])
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(config["SQLALCHEMY_DATABASE_URI"], config)
+    binds = {}
+    for key, bind in (config.get("SQLALCHEMY_BINDS") or {}).items():
+        url = normalize_url(bind if isinstance(bind, str) else bind["url"])
+        binds[key] = {"url": url, **engine_options(url, config)}
+    config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_engine_profiles(app: Flask) -> None:
+    """After db.init_app: per-connection hooks on every engine."""
+    from .extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            tune_engine(engine, app.config["SANTA_DB_PROFILE"])
+
+
+# --------- Concurrency benchmark (`flask santa bench-db`) ----------
+
+@dataclass
+class BenchResult:
+    profile: str
+    seconds: float
+    writes: int = 0
+    reads: int = 0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def throughput(self) -> float:
+        return (self.writes + self.reads) / self.seconds if self.seconds else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        if len(self.latencies) < 2:
+            return 0.0
+        return statistics.quantiles(self.latencies, n=20)[-1] * 1000
+
+
+def _seed(conn, metadata, participants: int) -> list[int]:
+    tables = metadata.tables
+    conn.execute(tables["events"].insert(), {"id": 1, "slug": "bench", "name": "bench"})
+    conn.execute(tables["assignment_state"].insert(), {"event_id": 1, "is_locked": False, "version": 0})
+    conn.execute(
+        tables["participants"].insert(),
+        [{"id": i, "event_id": 1, "name": f"p{i}", "passkey_hash": "x"} for i in range(1, participants + 1)],
+    )
+    return list(range(1, participants + 1))
+
+
+def _bench_once(engine: Engine, metadata, profile: str, threads: int, seconds: float, write_ratio: float) -> BenchResult:
+    from .coordination import ADVISORY_LOCK_NAMESPACE
+
+    participants, exclusions, state = (metadata.tables[t] for t in ("participants", "exclusions", "assignment_state"))
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+        ids = _seed(conn, metadata, 200)
+
+    def save_preferences(conn, giver: int) -> None:
+        # Same shape as set_user_preferences: event lock, version bump, rewrite.
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql(f"SELECT pg_advisory_xact_lock({ADVISORY_LOCK_NAMESPACE}, 1)")
+        conn.execute(state.update().where(state.c.event_id == 1).values(version=state.c.version + 1))
+        conn.execute(exclusions.delete().where(exclusions.c.giver_id == giver))
+        receivers = random.sample([i for i in ids if i != giver], 2)
+        conn.execute(exclusions.insert(), [{"event_id": 1, "giver_id": giver, "receiver_id": r} for r in receivers])
+        conn.commit()
+
+    def view_dashboard(conn, user: int) -> None:
+        conn.execute(state.select().where(state.c.event_id == 1)).all()
+        conn.execute(participants.select().where(participants.c.event_id == 1).order_by(participants.c.name)).all()
+        conn.execute(exclusions.select().where(exclusions.c.giver_id == user)).all()
+        conn.rollback()
+
+    result = BenchResult(profile, seconds)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker() -> None:
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            write = rng.random() < write_ratio
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    (save_preferences if write else view_dashboard)(conn, rng.choice(ids))
+            except exc.OperationalError:
+                with lock:
+                    result.errors += 1
+                continue
+            with lock:
+                result.latencies.append(time.perf_counter() - started)
+                if write:
+                    result.writes += 1
+                else:
+                    result.reads += 1
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return result
+
+
+def bench_concurrency(
+    config, url: str | None = None, threads: int = 8, seconds: float = 5.0, write_ratio: float = 0.2
+) -> list[BenchResult]:
+    """
+    Mixed preference saves / dashboard reads from `threads` threads, once per
+    profile. Without `url`, each profile gets a fresh temporary SQLite file;
+    a Postgres `url` is used through a scratch schema that is dropped after.
+    """
+    from .extensions import db
+
+    results = []
+    for profile in ("defaults", "tuned"):
+        profile_config = {**config, "SANTA_DB_PROFILE": profile, "SANTA_DB_POOL_SIZE": threads + 1}
+        scratch_dir = None
+        if url is None:
+            scratch_dir = tempfile.mkdtemp(prefix="santa-bench-")
+            target = f"sqlite:///{scratch_dir}/bench.db"
+        else:
+            target = normalize_url(url)
+        engine = create_engine(target, **engine_options(target, profile_config))
+        tune_engine(engine, profile)
+        schema = None
+        try:
+            if engine.dialect.name == "postgresql":
+                schema = f"santa_bench_{profile}_{int(time.time())}"
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+                engine = engine.execution_options(schema_translate_map={None: schema})
+            elif url is not None:
+                raise ValueError("bench-db only takes a Postgres --url; SQLite runs on scratch files.")
+            results.append(_bench_once(engine, db.metadata, profile, threads, seconds, write_ratio))
+        finally:
+            if schema:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+            engine.dispose()
+            if scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+    return results
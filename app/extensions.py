@@ -1,9 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from sqlalchemy import MetaData
 
+from .replicas import RoutingSession
+
 NAMING_CONVENTION = {
     "ix": "ix_%(column_0_label)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -12,8 +13,17 @@ NAMING_CONVENTION = {
     "pk": "pk_%(table_name)s",
 }
 
-db = SQLAlchemy(metadata=MetaData(naming_convention=NAMING_CONVENTION))
+db = SQLAlchemy(
+    metadata=MetaData(naming_convention=NAMING_CONVENTION),
+    session_options={"class_": RoutingSession},
+)
 login_manager = LoginManager()
-migrate = Migrate()
 csrf = CSRFProtect()
 
+
+def init_migrate(app) -> None:
+    # Flask-Migrate drags in Alembic (~200ms of imports); only `flask db ...` needs it.
+    from flask_migrate import Migrate
+
+    Migrate(app, db)
+
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+
+from flask import current_app, request, session, make_response
+from flask.views import MethodView
+
+from .models import AssignmentState
+from .tenancy import current_event_id
+
+
+# ---------------------------------------------------------------------------
+# Conditional GET
+#
+# Pages like "/" and "/my-assignment" only change when the event's assignment
+# state changes (lock, unlock, registration, deletion). AssignmentState.version
+# is bumped on each of those, so (event, version, user id) is a complete validator.
+#
+# The check happens BEFORE the view runs: a matching If-None-Match /
+# If-Modified-Since gets a bare 304 after a single scalar query, without
+# loading the user, running the view's queries or rendering templates.
+# ---------------------------------------------------------------------------
+
+
+def _session_user_id() -> str | None:
+    # Flask-Login keeps the id in the signed session cookie; reading it here
+    # avoids the load_user() query that current_user would trigger.
+    return session.get("_user_id")
+
+
+def _compute_etag(endpoint: str, event_id: int, version: int, user_id: str | None) -> str:
+    # The deploy (templates) and the asset build (fingerprinted file names in
+    # the HTML) can each change a page without changing the event's version.
+    config = current_app.config
+    salt = f"{config.get('SANTA_CACHE_SALT') or ''}:{config.get('SANTA_ASSETS_DIGEST', '')}"
+    admin_name = config.get("SANTA_ADMIN_NAME") or ""
+    raw = f"{salt}|{admin_name}|{endpoint}|{event_id}|{version}|{user_id or '-'}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _apply_cache_headers(response, etag: str, changed_at: datetime | None, user_id: str | None):
+    response.set_etag(etag)
+    if changed_at:
+        response.last_modified = changed_at.replace(tzinfo=timezone.utc)
+
+    # Always revalidate. Anything rendered for a logged-in user must never be
+    # stored by a shared cache; anonymous pages may be, but only keyed by cookie.
+    if user_id:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response
+
+
+def _not_modified(etag: str, changed_at: datetime | None) -> bool:
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110).
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and changed_at:
+        return changed_at.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+class ConditionalGetMixin(MethodView):
+    """
+    Adds ETag/Last-Modified validators keyed on the event's assignment-state
+    version and the session user, and answers matching GETs with 304.
+
+    Put it FIRST in the bases so it wraps the auth mixins: a 304 never
+    reveals anything the client didn't already receive for that same user.
+    """
+
+    def dispatch_request(self, *args, **kwargs):
+        # Pending flash messages must be rendered, so never short-circuit them.
+        if request.method != "GET" or "_flashes" in session:
+            return super().dispatch_request(*args, **kwargs)
+
+        event_id = current_event_id()
+        current = AssignmentState.current_version(event_id)
+        if current is None:
+            return super().dispatch_request(*args, **kwargs)
+
+        version, changed_at = current
+        user_id = _session_user_id()
+        etag = _compute_etag(request.endpoint or "", event_id, version, user_id)
+
+        if _not_modified(etag, changed_at):
+            response = make_response("", 304)
+            return _apply_cache_headers(response, etag, changed_at, user_id)
+
+        response = make_response(super().dispatch_request(*args, **kwargs))
+        # Redirects (not logged in, nothing assigned yet, ...) stay uncached.
+        if response.status_code == 200:
+            _apply_cache_headers(response, etag, changed_at, user_id)
+        return response
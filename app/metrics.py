@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hmac
+import os
+import time
+from functools import wraps
+
+from flask import Flask, current_app, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ---------------------------------------------------------------------------
+# Performance instrumentation
+#
+# Per request: latency, number of SQL statements and time spent in the DB.
+# Per operation: the expensive bits (Argon2, Fernet, the matching search).
+#
+# Under gunicorn every worker is its own process, so prometheus_client runs in
+# multiprocess mode: PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py before
+# anything imports prometheus_client) holds one mmap'd file per worker, and
+# /metrics aggregates them. Without it (flask run) the in-process registry is used.
+# ---------------------------------------------------------------------------
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+REQUEST_LATENCY = Histogram(
+    "santa_request_duration_seconds",
+    "Request latency by endpoint.",
+    ["endpoint", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter(
+    "santa_requests_total",
+    "Requests by endpoint and status code.",
+    ["endpoint", "method", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "santa_request_db_queries",
+    "SQL statements issued per request.",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "santa_request_db_seconds",
+    "Time spent executing SQL per request.",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+OPERATION_LATENCY = Histogram(
+    "santa_operation_duration_seconds",
+    "Latency of expensive operations (hashing, encryption, matching).",
+    ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+def timed(operation: str):
+    """Decorator: observe the wrapped call's duration under `operation`."""
+    histogram = OPERATION_LATENCY.labels(operation=operation)
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# --------- SQL accounting (shared with anything else that wants g.santa_sql) ----------
+
+class RequestSqlStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._santa_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    stats = g.get("santa_sql")
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - context._santa_query_start
+
+
+def _install_sql_hooks() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --------- Request timing ----------
+
+def _start_request_timer() -> None:
+    g.santa_request_start = time.perf_counter()
+    g.santa_sql = RequestSqlStats()
+
+
+def _observe_request(response):
+    start = g.get("santa_request_start")
+    if start is None:
+        return response
+    # Unmatched URLs (404s, scanners) share one label to keep cardinality bounded.
+    endpoint = request.endpoint or "unmatched"
+    REQUEST_LATENCY.labels(endpoint=endpoint, method=request.method).observe(time.perf_counter() - start)
+    REQUESTS.labels(endpoint=endpoint, method=request.method, status=str(response.status_code)).inc()
+    stats = g.santa_sql
+    REQUEST_DB_QUERIES.labels(endpoint=endpoint).observe(stats.count)
+    REQUEST_DB_SECONDS.labels(endpoint=endpoint).observe(stats.seconds)
+    return response
+
+
+def init_metrics(app: Flask) -> None:
+    _install_sql_hooks()
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+
+
+# --------- Exposition ----------
+
+def render_metrics() -> bytes:
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=multiproc_dir)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def scrape_token_ok() -> bool:
+    """True when the request carries `Authorization: Bearer <SANTA_METRICS_TOKEN>`."""
+    expected = current_app.config.get("SANTA_METRICS_TOKEN") or ""
+    auth = request.headers.get("Authorization", "")
+    if not expected or not auth.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(auth[len("Bearer "):].encode("utf-8"), expected.encode("utf-8"))
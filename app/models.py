@@ -1,13 +1,29 @@
 from datetime import datetime
+from flask import g, has_request_context
 from flask_login import UserMixin
+from sqlalchemy.exc import IntegrityError
 from .extensions import db, login_manager
 
+class Event(db.Model):
+    """
+    One gift exchange. Participants, exclusions and the assignment state all
+    belong to exactly one event; names only need to be unique within it.
+    """
+    __tablename__ = "events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(64), unique=True, nullable=False)
+    name = db.Column(db.String(128), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 class Participant(UserMixin, db.Model):
     __tablename__ = "participants"
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(64), unique=True, nullable=False)
-    email = db.Column(db.String(255), unique=True, nullable=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    name = db.Column(db.String(64), nullable=False)
+    email = db.Column(db.String(255), nullable=True)
 
     # salted Passlib hash of SHA-256(passphrase) from the browser
     passkey_hash = db.Column(db.String(255), nullable=False)
@@ -33,6 +49,15 @@ class Participant(UserMixin, db.Model):
     # Organizer-issued temporary passphrase is active; force change on first login.
     must_change_passphrase = db.Column(db.Boolean, default=False, nullable=False)
 
+    # Every lookup is "within this event": (event_id, name) also serves the
+    # admin list's keyset paging. The prefix search is a name range (see
+    # services/roster.py); on Postgres it needs the C-collated index.
+    __table_args__ = (
+        db.UniqueConstraint("event_id", "name", name="uq_participants_event_name"),
+        db.UniqueConstraint("event_id", "email", name="uq_participants_event_email"),
+        db.Index("ix_participants_event_reset", "event_id", "reset_requested", "name"),
+        db.Index("ix_participants_event_name_c", "event_id", db.text('name COLLATE "C"')).ddl_if(dialect="postgresql"),
+    )
 
 
 class Exclusion(db.Model):
@@ -41,6 +66,8 @@ class Exclusion(db.Model):
     """
     __tablename__ = "exclusions"
     id = db.Column(db.Integer, primary_key=True)
+    # Denormalised from the participants so a run reads one event's rules directly.
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
 
     giver_id = db.Column(db.Integer, db.ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
@@ -50,6 +77,7 @@ class Exclusion(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("giver_id", "receiver_id", name="uq_exclusion_giver_receiver"),
+        db.Index("ix_exclusions_event_receiver", "event_id", "receiver_id"),
     )
 
 
@@ -57,20 +85,97 @@ class AssignmentState(db.Model):
     __tablename__ = "assignment_state"
 
     id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), unique=True, nullable=False)
     run_at = db.Column(db.DateTime, nullable=True)
     is_locked = db.Column(db.Boolean, default=False, nullable=False)
 
+    # Bumped whenever something that public/assignment pages render changes
+    # (lock, unlock, registration, deletion). Drives ETag/Last-Modified.
+    version = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=True)
+
     @classmethod
-    def get_singleton(cls):
-        obj = cls.query.first()
+    def get_singleton(cls, event_id: int | None = None):
+        """The event's state row (the current event's by default), created on first use."""
+        if event_id is None:
+            from .tenancy import current_event_id  # tenancy imports the models
+
+            event_id = current_event_id()
+
+        # Memoised per request: the context processor, policies and the view
+        # all ask for it. Commits expire it, so later reads still refresh.
+        memo = g.setdefault("santa_states", {}) if has_request_context() else {}
+        if event_id in memo:
+            return memo[event_id]
+        obj = cls.query.filter_by(event_id=event_id).first()
         if not obj:
-            obj = cls()
-            db.session.add(obj)
-            db.session.commit()
+            # Normally created with the event (services/events.py); this covers
+            # older databases. The savepoint keeps a lost race from rolling
+            # back whatever the caller has pending (e.g. a new registration).
+            obj = cls(event_id=event_id)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(obj)
+            except IntegrityError:
+                # Another worker created it first (one row per event_id).
+                obj = cls.query.filter_by(event_id=event_id).one()
+            else:
+                db.session.commit()
+        memo[event_id] = obj
         return obj
 
+    @classmethod
+    def current_version(cls, event_id: int) -> tuple[int, datetime | None] | None:
+        """Cheap (version, changed_at) read used for conditional GETs."""
+        row = db.session.query(cls.version, cls.changed_at).filter(cls.event_id == event_id).first()
+        return (row.version, row.changed_at) if row else None
+
+    def bump_version(self) -> None:
+        # SQL-side increment so concurrent bumps from several workers don't collide.
+        self.version = AssignmentState.version + 1
+        self.changed_at = datetime.utcnow()
+
+
+class Notification(db.Model):
+    """
+    Outbox row: one message to one participant, written in the same
+    transaction as the change it announces and delivered by the sender
+    process (services/notifications.py). Doubles as the delivery log.
+    """
+    __tablename__ = "notifications"
+
+    PENDING, SENDING, SENT, FAILED, CANCELLED = "pending", "sending", "sent", "failed", "cancelled"
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
+    participant_id = db.Column(db.Integer, db.ForeignKey("participants.id", ondelete="CASCADE"), nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    # AssignmentState.version the message belongs to: re-enqueueing the same run is a no-op.
+    state_version = db.Column(db.Integer, nullable=False)
+
+    status = db.Column(db.String(16), default=PENDING, server_default=PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("participant_id", "kind", "state_version", name="uq_notifications_participant_kind_version"),
+        # The sender's claim query: due rows by status, oldest first.
+        db.Index("ix_notifications_status_due", "status", "next_attempt_at"),
+        db.Index("ix_notifications_event_status", "event_id", "status"),
+    )
+
 
 @login_manager.user_loader
 def load_user(user_id: str):
-    return Participant.query.get(int(user_id))
+    from .tenancy import current_event_id
+
+    p = db.session.get(Participant, int(user_id))
+    # A login is bound to its event; anything else is treated as logged out.
+    if p is None or p.event_id != current_event_id():
+        return None
+    return p
 
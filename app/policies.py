@@ -6,11 +6,26 @@ from flask_login import current_user
 from flask.views import MethodView
 
 from .models import AssignmentState
+from .tenancy import default_event
 
 
-def is_admin_user() -> bool:
+def event_admin_name(event_id: int) -> str:
+    """
+    Name of `event_id`'s admin account: SANTA_ADMIN_NAME, but only in the
+    default event. Names are unique per event only, so anywhere else anyone
+    could register it; other events are run from the CLI.
+    """
     admin_name = (current_app.config.get("SANTA_ADMIN_NAME") or "").strip()
-    return bool(admin_name) and current_user.is_authenticated and current_user.name == admin_name
+    if not admin_name or event_id != default_event().id:
+        return ""
+    return admin_name
+
+
+def is_admin_user() -> bool:
+    if not current_user.is_authenticated:
+        return False
+    admin_name = event_admin_name(current_user.event_id)
+    return bool(admin_name) and current_user.name == admin_name
 
 
 def assignments_locked() -> bool:
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ---------------------------------------------------------------------------
+# Query budgets (dev/test harness)
+#
+# Every MethodView declares `query_budget`: an int, or a dict keyed by HTTP
+# method (None = unbounded, for bulk views that work in chunks; those also set
+# `query_repeat_limit = None`). With SANTA_QUERY_BUDGETS enabled, each request
+# records the SQL it issues and is checked after the view returns:
+#   - more statements than the view's budget  -> violation
+#   - the same statement shape more than SANTA_QUERY_REPEAT_LIMIT times
+#     (the classic N+1)                        -> violation
+#
+# Modes: "off" (production default), "warn" (log; development default) and
+# "raise" (tests: the request fails with QueryBudgetExceeded).
+# ---------------------------------------------------------------------------
+
+MODES = {"off", "warn", "raise"}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_WS_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise away whitespace, literals and expanded IN lists."""
+    shape = _WS_RE.sub(" ", statement).strip()
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return _NUMBER_RE.sub("?", shape)
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    statements = g.get("santa_sql_statements")
+    if statements is not None:
+        statements.append(statement)
+
+
+def _view_limits(endpoint: str | None, method: str) -> tuple[int | None, int | None]:
+    """(budget, repeat limit) declared by the endpoint's view class."""
+    view = current_app.view_functions.get(endpoint) if endpoint else None
+    view_class = getattr(view, "view_class", None)
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        budget = budget.get(method)
+    repeat_limit = getattr(view_class, "query_repeat_limit", current_app.config["SANTA_QUERY_REPEAT_LIMIT"])
+    return budget, repeat_limit
+
+
+def check_statements(statements: list[str], budget: int | None, repeat_limit: int | None) -> list[str]:
+    """Returns human-readable violations (empty when within budget)."""
+    problems = []
+    if budget is not None and len(statements) > budget:
+        problems.append(f"{len(statements)} queries > budget {budget}")
+    if repeat_limit is None:
+        return problems
+    for shape, n in Counter(statement_shape(s) for s in statements).items():
+        if n > repeat_limit:
+            problems.append(f"same statement x{n} (possible N+1): {shape[:160]}")
+    return problems
+
+
+def _start_recording() -> None:
+    g.santa_sql_statements = []
+
+
+def _check_request(response):
+    statements = g.get("santa_sql_statements")
+    if statements is None:
+        return response
+
+    problems = check_statements(statements, *_view_limits(request.endpoint, request.method))
+    if problems:
+        msg = f"{request.method} {request.endpoint}: " + "; ".join(problems)
+        if current_app.config["SANTA_QUERY_BUDGETS"] == "raise":
+            listing = "\n".join(f"  {i + 1}. {statement_shape(s)}" for i, s in enumerate(statements))
+            raise QueryBudgetExceeded(f"{msg}\n{listing}")
+        current_app.logger.warning("Query budget: %s", msg)
+    return response
+
+
+def init_query_budgets(app: Flask) -> None:
+    mode = app.config.get("SANTA_QUERY_BUDGETS", "off")
+    if mode not in MODES:
+        raise ValueError(f"SANTA_QUERY_BUDGETS must be one of {sorted(MODES)}, got {mode!r}")
+    if mode == "off":
+        return
+
+    if not event.contains(Engine, "after_cursor_execute", _record_statement):
+        event.listen(Engine, "after_cursor_execute", _record_statement)
+    app.before_request(_start_recording)
+    app.after_request(_check_request)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from flask import Flask, current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+
+# ---------------------------------------------------------------------------
+# Read replicas
+#
+# DATABASE_REPLICA_URLS (comma-separated) adds read-only binds "replica0",
+# "replica1", ... next to the primary. RoutingSession sends a statement to a
+# replica only when all of these hold:
+#   - replica reads are on for this session: a GET/HEAD request, or a block
+#     wrapped in use_replica() (read-only CLI/services),
+#   - it is a plain SELECT (no FOR UPDATE),
+#   - nothing in this request has written yet: the first INSERT/UPDATE/DELETE,
+#     flush, raw text or session.connection() pins the rest of the request to
+#     the primary, so a request always reads what it wrote,
+#   - the browser session isn't inside its read-your-writes window: a request
+#     that wrote (preferences, passphrase change, ...) keeps that visitor on
+#     the primary for SANTA_REPLICA_RYW_SECONDS, longer than replica lag.
+# A request picks one replica and sticks to it. Coordination never touches
+# replicas: graph_snapshot() and the commit-phase locks use the primary
+# engine directly (see coordination.py).
+# ---------------------------------------------------------------------------
+
+REPLICA_READS = "santa_replica"
+PINNED = "santa_pinned_to_primary"
+RYW_SESSION_KEY = "santa_primary_until"
+
+
+def replica_keys(app: Flask | None = None) -> list[str]:
+    return (app or current_app).extensions.get("santa_replicas", [])
+
+
+def _is_plain_select(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if not _is_plain_select(clause):
+                self.info[PINNED] = True
+            elif self.info.get(REPLICA_READS) and not self.info.get(PINNED):
+                return self._db.engines[self.info[REPLICA_READS]]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _pick_replica() -> str | None:
+    keys = replica_keys()
+    return random.choice(keys) if keys else None
+
+
+@contextmanager
+def use_replica() -> Iterator[None]:
+    """Route this block's plain SELECTs to a replica (read-only services, CLI exports)."""
+    from .extensions import db
+
+    info = db.session.info
+    previous = info.get(REPLICA_READS), info.get(PINNED)
+    info[REPLICA_READS], info[PINNED] = _pick_replica(), False
+    try:
+        yield
+    finally:
+        info[REPLICA_READS], info[PINNED] = previous
+
+
+# --------- Request hooks ----------
+
+def _route_request() -> None:
+    from .extensions import db
+
+    info = db.session.info
+    fresh = session.get(RYW_SESSION_KEY, 0) > time.time()
+    info[REPLICA_READS] = _pick_replica() if request.method in {"GET", "HEAD"} and not fresh else None
+    info[PINNED] = False
+
+
+def _remember_writes(response):
+    from .extensions import db
+
+    if db.session.info.get(PINNED):
+        session[RYW_SESSION_KEY] = time.time() + current_app.config["SANTA_REPLICA_RYW_SECONDS"]
+    return response
+
+
+def init_replicas(app: Flask) -> None:
+    urls = [u.strip() for u in app.config.get("SANTA_REPLICA_URLS", "").split(",") if u.strip()]
+    if not urls:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    keys = []
+    for i, url in enumerate(urls):
+        keys.append(f"replica{i}")
+        binds[keys[-1]] = url
+    app.config["SQLALCHEMY_BINDS"] = binds
+    app.extensions["santa_replicas"] = keys
+    app.before_request(_route_request)
+    app.after_request(_remember_writes)
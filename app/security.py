@@ -3,25 +3,40 @@ from __future__ import annotations
 import base64
 import hashlib
 import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from cryptography.fernet import Fernet, InvalidToken
 from flask import current_app
-from passlib.context import CryptContext
 
+from .metrics import timed
 
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto",
-)
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+    from passlib.context import CryptContext
 
 
+# passlib/argon2 and cryptography are imported on first use (or by warmup()),
+# not at module import, to keep them off the cold-start path.
+
+@lru_cache(maxsize=1)
+def pwd_context() -> "CryptContext":
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+    )
+
+
+@timed("hash_client_key")
 def hash_client_key(client_hash: str) -> str:
     """Store an argon2 hash of the client-provided SHA-256(passphrase)."""
-    return pwd_context.hash(client_hash)
+    return pwd_context().hash(client_hash)
 
 
+@timed("verify_client_key")
 def verify_client_key(client_hash: str, stored_hash: str) -> bool:
-    return pwd_context.verify(client_hash, stored_hash)
+    return pwd_context().verify(client_hash, stored_hash)
 
 
 # ---------------------------------------------------------------------------
@@ -36,22 +51,30 @@ def verify_client_key(client_hash: str, stored_hash: str) -> bool:
 # ---------------------------------------------------------------------------
 
 
-def _assignment_fernet() -> Fernet:
+@lru_cache(maxsize=4)
+def _fernet_for_key(key: bytes) -> "Fernet":
+    from cryptography.fernet import Fernet
+
+    return Fernet(key)
+
+
+def _assignment_fernet() -> "Fernet":
     """Returns a Fernet instance keyed by ASSIGNMENT_ENC_KEY or derived from SECRET_KEY."""
     explicit = (os.environ.get("ASSIGNMENT_ENC_KEY") or "").strip()
     if explicit:
         # Expect a urlsafe base64-encoded 32-byte key.
         key = explicit.encode("utf-8")
-        return Fernet(key)
+        return _fernet_for_key(key)
 
     # Derive a stable key from Flask SECRET_KEY so decrypt works across restarts.
     # Fernet requires a urlsafe base64-encoded 32-byte key.
     secret = (current_app.config.get("SECRET_KEY") or "").encode("utf-8")
     digest = hashlib.sha256(b"secretsanta-assignments|" + secret).digest()
     key = base64.urlsafe_b64encode(digest)
-    return Fernet(key)
+    return _fernet_for_key(key)
 
 
+@timed("fernet_encrypt")
 def encrypt_assignment_recipient(receiver_id: int) -> str:
     """Encrypt receiver_id -> ciphertext token (string)."""
     f = _assignment_fernet()
@@ -59,8 +82,11 @@ def encrypt_assignment_recipient(receiver_id: int) -> str:
     return token.decode("utf-8")
 
 
+@timed("fernet_decrypt")
 def decrypt_assignment_recipient(token: str) -> int:
     """Decrypt ciphertext token -> receiver_id (int). Raises ValueError on failure."""
+    from cryptography.fernet import InvalidToken
+
     try:
         f = _assignment_fernet()
         raw = f.decrypt(token.encode("utf-8"))
@@ -68,3 +94,15 @@ def decrypt_assignment_recipient(token: str) -> int:
     except (InvalidToken, ValueError, TypeError) as e:
         raise ValueError("Invalid assignment token") from e
 
+
+def warmup() -> None:
+    """
+    Import and initialise the crypto backends up front (needs an app context).
+    Called in the gunicorn master with preload_app, so workers inherit it
+    copy-on-write instead of paying for it on their first login/reveal.
+    """
+    # Loading the argon2 backend is the expensive import; no need to pay for a hash.
+    pwd_context().handler().get_backend()
+    f = _assignment_fernet()
+    f.decrypt(f.encrypt(b"0"))
+
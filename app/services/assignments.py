@@ -1,110 +1,348 @@
 from __future__ import annotations
 
+import os
 import random
+import secrets
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime
-from flask import current_app
+from typing import Callable, Iterable, Iterator
 
+from ..coordination import StateChanged, claim_unlocked, graph_snapshot, lock_event_for_write
 from ..extensions import db
-from ..models import Participant, AssignmentState, Exclusion
+from ..metrics import timed
+from ..models import Event, Participant, AssignmentState, Exclusion
+from ..policies import event_admin_name
 from ..security import encrypt_assignment_recipient
+from .notifications import cancel_pending, enqueue_assignment_ready
 
 
 class AssignmentError(RuntimeError):
     pass
 
 
-def _pool_participants_excluding_admin() -> list[Participant]:
-    admin_name = (current_app.config.get("SANTA_ADMIN_NAME") or "").strip()
-    q = Participant.query
+class AssignmentConflict(AssignmentError):
+    """The event changed (or was run) between reading the pool and committing."""
+
+
+class PoolTooSmall(AssignmentError):
+    """Fewer than 2 people to draw between: nothing to run yet."""
+
+
+def _pool_criteria(event_id: int) -> list:
+    admin_name = event_admin_name(event_id)
+    criteria = [Participant.event_id == event_id]
     if admin_name:
-        q = q.filter(Participant.name != admin_name)
-    return q.all()
+        criteria.append(Participant.name != admin_name)
+    return criteria
+
+
+def _pool_ids(conn, event_id: int) -> list[int]:
+    return list(conn.scalars(db.select(Participant.id).where(*_pool_criteria(event_id))))
 
 
-def _exclusion_map(participants: list[Participant]) -> dict[int, set[int]]:
-    ids = {p.id for p in participants}
-    excluded = {p.id: set() for p in participants}
-    for e in Exclusion.query.all():
-        if e.giver_id in ids and e.receiver_id in ids:
-            excluded[e.giver_id].add(e.receiver_id)
+def _exclusion_map(conn, event_id: int, pool_ids: list[int]) -> dict[int, set[int]]:
+    ids = set(pool_ids)
+    excluded: dict[int, set[int]] = {pid: set() for pid in ids}
+    rows = conn.execute(
+        db.select(Exclusion.giver_id, Exclusion.receiver_id).where(Exclusion.event_id == event_id)
+    )
+    for giver_id, receiver_id in rows:
+        if giver_id in ids and receiver_id in ids:
+            excluded[giver_id].add(receiver_id)
     return excluded
 
 
-def _find_matching(giver_ids: list[int], allowed: dict[int, list[int]]) -> dict[int, int] | None:
-    giver_order = sorted(giver_ids, key=lambda gid: len(allowed[gid]))
-    used = set()
-    result: dict[int, int] = {}
+# Upper bound on backtracking steps for one pool. Plain pools solve in about
+# one step per giver; only near-infeasible exclusion sets get anywhere close.
+MAX_SEARCH_STEPS = 2_000_000
 
-    def dfs(i: int) -> bool:
-        if i == len(giver_order):
-            return True
-        g = giver_order[i]
-        candidates = allowed[g][:]
-        random.shuffle(candidates)
-        for r in candidates:
-            if r in used:
-                continue
-            used.add(r)
-            result[g] = r
-            if dfs(i + 1):
-                return True
-            used.remove(r)
-            result.pop(g, None)
-        return False
 
-    return result if dfs(0) else None
+def _random_order(receivers: list[int], rng: random.Random) -> Iterator[int]:
+    """Lazy Fisher-Yates: a uniform permutation, O(1) per item actually consumed."""
+    moved: dict[int, int] = {}
+    n = len(receivers)
+    for i in range(n):
+        j = rng.randrange(i, n)
+        pick = moved.get(j, j)
+        moved[j] = moved.get(i, i)
+        yield receivers[pick]
 
 
-def run_and_lock_assignments() -> None:
-    state = AssignmentState.get_singleton()
-    if state.is_locked:
-        return
+@timed("find_matching")
+def _find_matching(
+    giver_ids: list[int],
+    excluded: dict[int, set[int]],
+    rng: random.Random,
+    max_steps: int = MAX_SEARCH_STEPS,
+) -> dict[int, int] | None:
+    # Iterative DFS (pools can be deeper than the recursion limit), most
+    # constrained giver first. Each stack entry yields one giver's untried
+    # receivers in random order; backtracking pops it and frees that level's
+    # receiver. Nothing is O(pool) per level, so big pools stay ~linear.
+    giver_order = sorted(giver_ids, key=lambda gid: -len(excluded.get(gid, ())))
+    used: set[int] = set()
+    result: dict[int, int] = {}
 
-    people = _pool_participants_excluding_admin()
-    if len(people) < 2:
-        raise AssignmentError("Need at least 2 non-admin participants to run assignments.")
+    def candidates(level: int) -> Iterator[int]:
+        g = giver_order[level]
+        banned = excluded.get(g, ())
+        return (r for r in _random_order(giver_ids, rng) if r != g and r not in banned)
 
-    ids = [p.id for p in people]
-    excluded = _exclusion_map(people)
-    all_receivers = set(ids)
+    stack = [candidates(0)]
+    steps = 0
+    while stack:
+        g = giver_order[len(stack) - 1]
+        if g in result:
+            used.discard(result.pop(g))
+        for r in stack[-1]:
+            steps += 1
+            if steps > max_steps:
+                raise AssignmentError(f"Gave up after {max_steps:,} search steps; try loosening some exclusions.")
+            if r not in used:
+                break
+        else:
+            stack.pop()
+            continue
+        used.add(r)
+        result[g] = r
+        if len(stack) == len(giver_order):
+            return result
+        stack.append(candidates(len(stack)))
+    return None
 
-    allowed: dict[int, list[int]] = {}
-    for gid in ids:
-        disallowed = set(excluded.get(gid, set()))
-        disallowed.add(gid)
-        allowed_list = sorted(list(all_receivers - disallowed))
-        allowed[gid] = allowed_list
 
-    if any(len(allowed[gid]) == 0 for gid in ids):
+def solve_pool(
+    ids: list[int],
+    excluded: dict[int, set[int]],
+    seed: int | None = None,
+    max_steps: int = MAX_SEARCH_STEPS,
+) -> dict[int, int]:
+    """
+    giver -> receiver for one pool. Pure (no DB, no app), so it can run in a
+    worker process; raises AssignmentError when the pool has no solution.
+    """
+    pool = set(ids)
+    if any(len((excluded.get(gid, set()) & pool) - {gid}) >= len(pool) - 1 for gid in ids):
         raise AssignmentError("No valid assignment: someone has zero allowed recipients.")
 
-    assignment = _find_matching(ids, allowed)
+    assignment = _find_matching(ids, excluded, random.Random(seed), max_steps)
     if not assignment:
         raise AssignmentError("No valid assignment satisfies the current filters.")
+    return assignment
+
+
+def _load_pool(event_id: int) -> tuple[int, list[int], dict[int, set[int]]] | None:
+    """(state version, pool ids, exclusions) from one snapshot; None if already locked."""
+    AssignmentState.get_singleton(event_id)  # make sure the row exists
+    with graph_snapshot() as conn:
+        version, locked = conn.execute(
+            db.select(AssignmentState.version, AssignmentState.is_locked).where(AssignmentState.event_id == event_id)
+        ).one()
+        if locked:
+            return None
+        ids = _pool_ids(conn, event_id)
+        if len(ids) < 2:
+            raise PoolTooSmall("Need at least 2 non-admin participants to run assignments.")
+        return version, ids, _exclusion_map(conn, event_id, ids)
 
-    id_map = {p.id: p for p in people}
-    for giver_id, receiver_id in assignment.items():
-        giver = id_map[giver_id]
-        # Store ONLY the encrypted receiver id.
-        giver.assigned_to_ciphertext = encrypt_assignment_recipient(receiver_id)
-        # Defense-in-depth: ensure we never leave plaintext assignment behind.
-        giver.assigned_to_id = None
 
-    state.is_locked = True
-    state.run_at = datetime.utcnow()
+def _store_assignment(event_id: int, version: int, assignment: dict[int, int]) -> None:
+    """Commit phase: lock, compare-and-swap the state, write, enqueue reveals, commit."""
+    lock_event_for_write(event_id)
+    try:
+        claim_unlocked(event_id, expected_version=version, is_locked=True, run_at=datetime.utcnow())
+    except StateChanged as e:
+        raise AssignmentConflict(
+            "Assignments were run or participants/preferences changed meanwhile. Please try again."
+        ) from e
+
+    # One executemany UPDATE by primary key; no Participant objects needed.
+    db.session.execute(
+        db.update(Participant),
+        [
+            {
+                "id": giver_id,
+                # Store ONLY the encrypted receiver id.
+                "assigned_to_ciphertext": encrypt_assignment_recipient(receiver_id),
+                # Defense-in-depth: ensure we never leave plaintext assignment behind.
+                "assigned_to_id": None,
+            }
+            for giver_id, receiver_id in assignment.items()
+        ],
+    )
+    # Outbox rows commit (or roll back) together with the assignment.
+    enqueue_assignment_ready(event_id, version + 1)
     db.session.commit()
 
 
-def unset_and_unlock_assignments() -> None:
-    state = AssignmentState.get_singleton()
+def run_and_lock_assignments(event_id: int) -> None:
+    pool = _load_pool(event_id)
+    if pool is None:
+        return
+    version, ids, excluded = pool
+    try:
+        _store_assignment(event_id, version, solve_pool(ids, excluded, seed=secrets.randbits(64)))
+    except AssignmentConflict:
+        # Lost to a concurrent run: same outcome as finding it locked.
+        locked = db.session.scalar(db.select(AssignmentState.is_locked).where(AssignmentState.event_id == event_id))
+        if not locked:
+            raise
+
+
+def unset_and_unlock_assignments(event_id: int) -> None:
+    lock_event_for_write(event_id)
 
     # Clear assignments for non-admin pool
-    people = _pool_participants_excluding_admin()
-    for p in people:
-        p.assigned_to_id = None
-        p.assigned_to_ciphertext = None
+    db.session.execute(
+        db.update(Participant)
+        .where(*_pool_criteria(event_id))
+        .values(assigned_to_id=None, assigned_to_ciphertext=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    cancel_pending(event_id)
 
+    state = AssignmentState.get_singleton(event_id)
     state.is_locked = False
     state.run_at = None
+    state.bump_version()
     db.session.commit()
 
+
+# ---------------------------------------------------------------------------
+# Batch runs
+#
+# Solves every unlocked event in one go. The parent process loads each pool
+# (a few small queries), a process pool solves them (pure CPU), and the parent stores
+# and commits each result as soon as it arrives, in its own transaction. A
+# pool that is infeasible or hits the step budget fails on its own; nothing
+# waits on it. Pools are submitted a few per worker at a time, so memory stays
+# flat however many events are pending.
+#
+# Each pool goes through the same snapshot / compare-and-swap commit as an
+# interactive run (see coordination.py): a pool whose state changed while it
+# was being solved (registration, exclusion edits, an admin run) is skipped
+# rather than locked with a stale result.
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PoolResult:
+    event_id: int
+    slug: str
+    status: str  # "assigned" | "failed" | "skipped"
+    participants: int = 0
+    seconds: float = 0.0
+    message: str = ""
+
+
+@dataclass
+class _Job:
+    event_id: int
+    slug: str
+    version: int
+    participants: int
+    started: float
+
+
+def pending_events(slugs: Iterable[str] | None = None) -> list[tuple[int, str]]:
+    """(id, slug) of events whose assignments are not locked."""
+    stmt = (
+        db.select(Event.id, Event.slug)
+        .outerjoin(AssignmentState, AssignmentState.event_id == Event.id)
+        .where(db.or_(AssignmentState.id.is_(None), AssignmentState.is_locked.is_(False)))
+        .order_by(Event.id.asc())
+    )
+    if slugs:
+        stmt = stmt.where(Event.slug.in_(list(slugs)))
+    return [(event_id, slug) for event_id, slug in db.session.execute(stmt)]
+
+
+def _finish(job: _Job, future: Future) -> PoolResult:
+    result = PoolResult(job.event_id, job.slug, "failed", participants=job.participants)
+    try:
+        _store_assignment(job.event_id, job.version, future.result())
+        result.status = "assigned"
+    except AssignmentConflict:
+        result.status, result.message = "skipped", "changed while solving; run it again"
+    except AssignmentError as e:
+        result.message = str(e)
+    except BrokenProcessPool:
+        # A solver process died (OOM kill, crash): every pool in flight on it
+        # fails; the batch carries on with a fresh pool.
+        result.message = "solver process died (out of memory?); run it again"
+    except Exception as e:  # one bad pool must not stop the batch
+        db.session.rollback()
+        result.message = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - job.started
+    return result
+
+
+def run_pending_assignments(
+    slugs: Iterable[str] | None = None,
+    workers: int | None = None,
+    max_steps: int = MAX_SEARCH_STEPS,
+    on_result: Callable[[PoolResult], None] | None = None,
+) -> list[PoolResult]:
+    workers = workers or os.cpu_count() or 1
+    todo = iter(pending_events(slugs))
+    in_flight: dict[Future, _Job] = {}
+    results: list[PoolResult] = []
+
+    def record(result: PoolResult) -> None:
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+
+    def solve(ids: list[int], excluded: dict[int, set[int]]) -> Future:
+        # A solver process that died (OOM kill, segfault) breaks the whole
+        # pool: its in-flight pools fail in _finish, the rest get a new pool.
+        nonlocal executor
+        args = (solve_pool, ids, excluded, secrets.randbits(64), max_steps)
+        try:
+            return executor.submit(*args)
+        except BrokenProcessPool:
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = ProcessPoolExecutor(max_workers=workers)
+            return executor.submit(*args)
+
+    def submit_next() -> bool:
+        for event_id, slug in todo:
+            started = time.perf_counter()
+            try:
+                pool = _load_pool(event_id)
+            except PoolTooSmall as e:
+                record(PoolResult(event_id, slug, "skipped", message=str(e)))
+                continue
+            except AssignmentError as e:
+                record(PoolResult(event_id, slug, "failed", message=str(e)))
+                continue
+            except Exception as e:  # as in _finish: one bad event must not stop the batch
+                db.session.rollback()
+                record(PoolResult(event_id, slug, "failed", message=f"{type(e).__name__}: {e}"))
+                continue
+            if pool is None:
+                record(PoolResult(event_id, slug, "skipped", message="locked meanwhile"))
+                continue
+            version, ids, excluded = pool
+            future = solve(ids, excluded)
+            in_flight[future] = _Job(event_id, slug, version, len(ids), started)
+            return True
+        return False
+
+    try:
+        while len(in_flight) < 4 * workers and submit_next():
+            pass
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(_finish(in_flight.pop(future), future))
+                submit_next()
+    finally:
+        executor.shutdown()
+
+    return results
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import re
+
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Event, AssignmentState, Participant
+
+
+SLUG_RE = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,62}[a-z0-9])?$")
+DEFAULT_EVENT_NAME = "Secret Santa"
+
+
+class EventError(ValueError):
+    pass
+
+
+def create_event(slug: str, name: str | None = None) -> Event:
+    """New event plus its assignment state row."""
+    slug = (slug or "").strip().lower()
+    if not SLUG_RE.match(slug):
+        raise EventError("Event slug must be lowercase letters, digits and dashes (max 64).")
+    if db.session.scalar(db.select(Event.id).where(Event.slug == slug)) is not None:
+        raise EventError(f"Event {slug!r} already exists.")
+
+    event = Event(slug=slug, name=(name or "").strip() or slug)
+    db.session.add(event)
+    db.session.flush()
+    db.session.add(AssignmentState(event_id=event.id))
+    db.session.commit()
+    return event
+
+
+def ensure_event(slug: str, name: str = DEFAULT_EVENT_NAME) -> int:
+    """Id of the event with this slug, creating it if needed (safe across workers)."""
+    event_id = db.session.scalar(db.select(Event.id).where(Event.slug == slug))
+    if event_id is not None:
+        return event_id
+    try:
+        return create_event(slug, name).id
+    except IntegrityError:
+        # Another worker created it between our read and insert.
+        db.session.rollback()
+        return db.session.scalar(db.select(Event.id).where(Event.slug == slug))
+
+
+def list_events() -> list[tuple[Event, int]]:
+    """(event, participant count) for every event, oldest first."""
+    counts = (
+        db.select(Participant.event_id, db.func.count(Participant.id).label("n"))
+        .group_by(Participant.event_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(Event, db.func.coalesce(counts.c.n, 0))
+        .outerjoin(counts, counts.c.event_id == Event.id)
+        .order_by(Event.id.asc())
+    )
+    return [(event, n) for event, n in rows]
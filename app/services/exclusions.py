@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from ..coordination import StateChanged, claim_unlocked, lock_event_for_write
+from ..extensions import db
+from ..models import Participant, Exclusion, AssignmentState
+from .imports import chunked
+from .streaming import csv_pieces, jsonl_pieces
+
+
+# ---------------------------------------------------------------------------
+# Bulk exclusion import/export (HR-sourced constraints: reporting lines,
+# households, ...). Records are {"giver": name, "receiver": name}.
+#
+# Both directions stream: import works chunk by chunk with an insert that
+# skips rows already covered by uq_exclusion_giver_receiver, export walks a
+# server-side cursor. The only state held is the participant name <-> id index.
+# Everything is scoped to one event: names resolve within it, rows are tagged
+# with it.
+# ---------------------------------------------------------------------------
+
+EXPORT_BATCH = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class ExclusionImportError(ValueError):
+    pass
+
+
+@dataclass
+class ExclusionImportReport:
+    read: int = 0
+    inserted: int = 0
+    existing: int = 0
+    unknown: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def skip(self, message: str) -> None:
+        # Keep memory flat on a file full of bad rows.
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"record {self.read}: {message}")
+
+
+def name_index(event_id: int) -> dict[str, int]:
+    stmt = db.select(Participant.name, Participant.id).where(Participant.event_id == event_id)
+    return {name: pid for name, pid in db.session.execute(stmt)}
+
+
+def _insert_skipping_conflicts():
+    table = Exclusion.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table).on_conflict_do_nothing(constraint="uq_exclusion_giver_receiver")
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).on_conflict_do_nothing(index_elements=["giver_id", "receiver_id"])
+    else:
+        raise ExclusionImportError(f"Bulk exclusion import is not supported on {dialect}.")
+    # RETURNING only yields rows that were actually inserted -> exact counts.
+    return stmt.returning(table.c.id)
+
+
+def import_exclusions(event_id: int, records: Iterable[dict], chunk_size: int = 5000) -> ExclusionImportReport:
+    state = AssignmentState.get_singleton(event_id)
+    if state.is_locked:
+        raise ExclusionImportError("Assignments are locked; unset them before importing exclusions.")
+
+    index = name_index(event_id)
+    stmt = _insert_skipping_conflicts()
+    report = ExclusionImportReport()
+    started = time.perf_counter()
+
+    for chunk in chunked(records, chunk_size):
+        pairs: set[tuple[int, int]] = set()
+        valid = 0
+        for raw in chunk:
+            report.read += 1
+            giver = (raw.get("giver") or "").strip()
+            receiver = (raw.get("receiver") or "").strip()
+            if not giver or not receiver or giver == receiver:
+                report.invalid += 1
+                report.skip("needs two different names")
+                continue
+            gid, rid = index.get(giver), index.get(receiver)
+            if gid is None or rid is None:
+                report.unknown += 1
+                report.skip(f"unknown participant {giver if gid is None else receiver!r}")
+                continue
+            pairs.add((gid, rid))
+            valid += 1
+
+        if pairs:
+            rows = [{"event_id": event_id, "giver_id": gid, "receiver_id": rid} for gid, rid in pairs]
+            # Each chunk bumps the version under the run lock, so a run that
+            # read the old rules can't lock them in (see coordination.py).
+            lock_event_for_write(event_id)
+            try:
+                claim_unlocked(event_id)
+            except StateChanged as e:
+                raise ExclusionImportError(
+                    f"Assignments were locked during the import; {report.inserted} rows were imported before that."
+                ) from e
+            inserted = len(db.session.execute(stmt, rows).all())
+            db.session.commit()
+            report.inserted += inserted
+            # Repeats within the chunk count as already present, like rows already stored.
+            report.existing += valid - inserted
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def export_exclusions(event_id: int, fmt: str = "csv") -> Iterator[str]:
+    """Yields the export in ~64KB pieces (header first for CSV)."""
+    if fmt not in {"csv", "jsonl"}:
+        raise ExclusionImportError(f"Unknown format: {fmt}")
+
+    names = {pid: name for name, pid in name_index(event_id).items()}
+    stmt = (
+        db.select(Exclusion.giver_id, Exclusion.receiver_id)
+        .where(Exclusion.event_id == event_id)
+        .order_by(Exclusion.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    pairs = (
+        (names.get(giver_id), names.get(receiver_id))
+        for giver_id, receiver_id in db.session.execute(stmt)
+    )
+    pairs = ((giver, receiver) for giver, receiver in pairs if giver is not None and receiver is not None)
+
+    if fmt == "jsonl":
+        return jsonl_pieces({"giver": giver, "receiver": receiver} for giver, receiver in pairs)
+    return csv_pieces(pairs, header=["giver", "receiver"])
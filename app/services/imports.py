@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator
+
+from ..coordination import StateChanged, claim_unlocked, lock_event_for_write
+from ..extensions import db
+from ..models import Participant, AssignmentState
+from ..security import hash_client_key
+
+
+# ---------------------------------------------------------------------------
+# Bulk participant import
+#
+# Streams CSV/JSONL records (name, email, client_hash | passphrase) in chunks:
+#   1. validate + de-duplicate within the file,
+#   2. one set-based query per chunk to skip names/emails already registered
+#      in the target event,
+#   3. Argon2-hash the survivors in a process pool (the only expensive step),
+#   4. one executemany INSERT ... ON CONFLICT DO NOTHING per chunk (someone
+#      may register through the web after step 2), committed per chunk.
+# Imported accounts get must_change_passphrase, like an admin reset.
+# ---------------------------------------------------------------------------
+
+NAME_MAX_LEN = Participant.name.type.length
+SHA256_HEX_LEN = 64
+MAX_REPORTED_ERRORS = 100
+
+
+class ParticipantImportError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    inserted: int = 0
+    existing: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """Yields raw dict records; never loads the whole file."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def client_hash_for_passphrase(passphrase: str) -> str:
+    """Same value the browser sends: hex SHA-256 of the trimmed passphrase."""
+    return hashlib.sha256(passphrase.strip().encode("utf-8")).hexdigest()
+
+
+def _normalise(raw: dict) -> tuple[str, str | None, str]:
+    name = (raw.get("name") or "").strip()
+    email = (raw.get("email") or "").strip() or None
+    client_hash = (raw.get("client_hash") or "").strip().lower()
+    passphrase = raw.get("passphrase") or ""
+
+    if not name or len(name) > NAME_MAX_LEN:
+        raise ParticipantImportError(f"invalid name {name!r}")
+    if not client_hash:
+        if not passphrase.strip():
+            raise ParticipantImportError(f"{name}: needs client_hash or passphrase")
+        client_hash = client_hash_for_passphrase(passphrase)
+    if len(client_hash) != SHA256_HEX_LEN or any(c not in "0123456789abcdef" for c in client_hash):
+        raise ParticipantImportError(f"{name}: client_hash must be hex SHA-256")
+    return name, email, client_hash
+
+
+def chunked(it: Iterable, size: int) -> Iterator[list]:
+    it = iter(it)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _existing(event_id: int, column, values: set[str]) -> set[str]:
+    if not values:
+        return set()
+    stmt = db.select(column).where(Participant.event_id == event_id, column.in_(values))
+    return set(db.session.scalars(stmt))
+
+
+def _insert_skipping_taken():
+    """
+    INSERT that skips names/emails registered since the duplicate check (the
+    web can register someone meanwhile). No conflict target: either unique
+    constraint counts.
+    """
+    table = Participant.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ParticipantImportError(f"Bulk participant import is not supported on {dialect}.")
+    # RETURNING only yields rows that were actually inserted -> exact counts.
+    return insert(table).on_conflict_do_nothing().returning(table.c.id)
+
+
+def import_participants(
+    event_id: int,
+    records: Iterable[dict],
+    chunk_size: int = 500,
+    workers: int | None = None,
+    on_chunk: Callable[[ImportReport], None] | None = None,
+) -> ImportReport:
+    state = AssignmentState.get_singleton(event_id)
+    if state.is_locked:
+        raise ParticipantImportError("Assignments are locked; unset them before importing participants.")
+
+    workers = workers or os.cpu_count() or 1
+    report = ImportReport()
+    seen_names: set[str] = set()
+    seen_emails: set[str] = set()
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunked(records, chunk_size):
+            rows: list[tuple[str, str | None, str]] = []
+            for raw in chunk:
+                report.read += 1
+                try:
+                    name, email, client_hash = _normalise(raw)
+                except ParticipantImportError as e:
+                    report.invalid += 1
+                    if len(report.errors) < MAX_REPORTED_ERRORS:
+                        report.errors.append(f"record {report.read}: {e}")
+                    continue
+                if name in seen_names or (email and email in seen_emails):
+                    report.duplicates += 1
+                    continue
+                seen_names.add(name)
+                if email:
+                    seen_emails.add(email)
+                rows.append((name, email, client_hash))
+
+            taken_names = _existing(event_id, Participant.name, {r[0] for r in rows})
+            taken_emails = _existing(event_id, Participant.email, {r[1] for r in rows if r[1]})
+            fresh = [r for r in rows if r[0] not in taken_names and r[1] not in taken_emails]
+            report.existing += len(rows) - len(fresh)
+            # Don't sit in the read transaction through the hashing below; the
+            # lock, compare-and-swap and INSERT get a short transaction of their own.
+            db.session.rollback()
+
+            if fresh:
+                hashes = list(pool.map(
+                    hash_client_key,
+                    [r[2] for r in fresh],
+                    chunksize=max(1, len(fresh) // (4 * workers)),
+                ))
+                lock_event_for_write(event_id)
+                try:
+                    claim_unlocked(event_id)
+                except StateChanged as e:
+                    raise ParticipantImportError(
+                        f"Assignments were locked during the import; {report.inserted} were imported before that."
+                    ) from e
+                inserted = db.session.execute(
+                    _insert_skipping_taken(),
+                    [
+                        {
+                            "event_id": event_id,
+                            "name": name,
+                            "email": email,
+                            "passkey_hash": passkey_hash,
+                            "must_change_passphrase": True,
+                        }
+                        for (name, email, _), passkey_hash in zip(fresh, hashes)
+                    ],
+                ).all()
+                db.session.commit()
+                report.inserted += len(inserted)
+                report.existing += len(fresh) - len(inserted)
+
+            report.seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(report)
+
+    report.seconds = time.perf_counter() - started
+    return report
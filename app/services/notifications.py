@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable, Iterator
+
+from flask import current_app
+
+from ..coordination import begin_write
+from ..extensions import db
+from ..models import Event, Notification, Participant
+
+
+# ---------------------------------------------------------------------------
+# Notifications
+#
+# Outbox: enqueue_* only INSERTs rows, in the caller's transaction. An
+# assignment run enqueues "your assignment is ready" for everyone with an
+# email atomically with the lock, so a message is never lost or sent for a run
+# that rolled back. Web workers never talk to SMTP.
+#
+# Sender (`flask santa send-notifications`, its own process):
+#   - claims up to batch_size due rows at a time (SKIP LOCKED on Postgres, so
+#     several senders can share the queue; claims of a sender that died are
+#     picked up again after CLAIM_LEASE),
+#   - sends over a small pool of SMTP connections that stay open across
+#     messages and batches (reconnecting when the server drops one),
+#   - throttled by a token bucket (SANTA_NOTIFY_RATE messages/second),
+#   - records each outcome: sent; retried with exponential backoff on
+#     transient errors; failed on permanent (5xx) ones or after
+#     SANTA_NOTIFY_MAX_ATTEMPTS.
+# ---------------------------------------------------------------------------
+
+ASSIGNMENT_READY = "assignment_ready"
+
+CLAIM_LEASE = timedelta(minutes=10)
+RETRY_BASE = timedelta(seconds=30)
+RETRY_MAX = timedelta(hours=1)
+SMTP_TIMEOUT = 30
+MESSAGES_PER_CONNECTION = 100
+
+
+def notifications_enabled() -> bool:
+    return bool(current_app.config.get("SMTP_HOST"))
+
+
+# --------- Enqueue (web side) ----------
+
+def enqueue_assignment_ready(event_id: int, state_version: int) -> None:
+    """One INSERT ... SELECT for every assigned participant with an email. Caller commits."""
+    if not notifications_enabled():
+        return
+    now = datetime.utcnow()
+    table = Notification.__table__
+    recipients = db.select(
+        Participant.event_id,
+        Participant.id,
+        db.literal(ASSIGNMENT_READY),
+        db.literal(state_version),
+        db.literal(now),
+        db.literal(now),
+    ).where(
+        Participant.event_id == event_id,
+        Participant.email.isnot(None),
+        Participant.assigned_to_ciphertext.isnot(None),
+    )
+    db.session.execute(
+        table.insert().from_select(
+            ["event_id", "participant_id", "kind", "state_version", "next_attempt_at", "created_at"], recipients
+        )
+    )
+
+
+def cancel_pending(event_id: int) -> None:
+    """
+    Unsent reveals are moot once assignments are unset: queued ones, and ones a
+    sender has claimed but not sent yet. Caller commits.
+    """
+    db.session.execute(
+        db.update(Notification)
+        .where(
+            Notification.event_id == event_id,
+            Notification.status.in_([Notification.PENDING, Notification.SENDING]),
+        )
+        .values(status=Notification.CANCELLED)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def notification_counts(event_id: int | None = None) -> dict[str, int]:
+    stmt = db.select(Notification.status, db.func.count(Notification.id)).group_by(Notification.status)
+    if event_id is not None:
+        stmt = stmt.where(Notification.event_id == event_id)
+    return {status: n for status, n in db.session.execute(stmt)}
+
+
+# --------- SMTP plumbing ----------
+
+class RateLimiter:
+    """Token bucket shared by the sending threads; rate <= 0 disables it."""
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class SmtpPool:
+    """Up to `size` SMTP connections, each reused for MESSAGES_PER_CONNECTION messages."""
+
+    def __init__(self, config, size: int) -> None:
+        self.config = config
+        self.size = size
+        self._idle: queue.LifoQueue[smtplib.SMTP] = queue.LifoQueue()
+
+    def _connect(self) -> smtplib.SMTP:
+        host, port = self.config["SMTP_HOST"], self.config["SMTP_PORT"]
+        security = self.config["SMTP_SECURITY"]
+        if security == "ssl":
+            conn = smtplib.SMTP_SSL(host, port, timeout=SMTP_TIMEOUT)
+        else:
+            conn = smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT)
+            if security == "starttls":
+                conn.starttls()
+        if self.config.get("SMTP_USERNAME"):
+            conn.login(self.config["SMTP_USERNAME"], self.config.get("SMTP_PASSWORD") or "")
+        conn.santa_sent = 0
+        return conn
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP) -> None:
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    @contextmanager
+    def _connection(self) -> Iterator[tuple[smtplib.SMTP, bool]]:
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(), False
+        healthy = False
+        try:
+            yield conn, reused
+            healthy = True
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            healthy = True  # the server refused this message; the session is fine
+            raise
+        finally:
+            if not healthy:
+                conn.close()
+            elif conn.santa_sent >= MESSAGES_PER_CONNECTION:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+
+    def send(self, msg: EmailMessage) -> None:
+        try:
+            with self._connection() as (conn, reused):
+                conn.send_message(msg)
+                conn.santa_sent += 1
+        except smtplib.SMTPServerDisconnected:
+            if not reused:
+                raise
+            # Servers drop idle connections; one retry on a fresh one.
+            with self._connection() as (conn, _):
+                conn.send_message(msg)
+                conn.santa_sent += 1
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _is_permanent(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return False  # our config, not this message: keep retrying
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code >= 500
+    # Anything but a network/SMTP error is about this message (unusable
+    # address or header, a bug while building it): retrying won't help.
+    return not isinstance(exc, (smtplib.SMTPException, OSError))
+
+
+# --------- Sender ----------
+
+@dataclass
+class DispatchReport:
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def _claim(batch_size: int) -> list[int]:
+    now = datetime.utcnow()
+    due = (Notification.status == Notification.PENDING) & (Notification.next_attempt_at <= now)
+    abandoned = (Notification.status == Notification.SENDING) & (Notification.claimed_at < now - CLAIM_LEASE)
+
+    begin_write()
+    stmt = db.select(Notification.id).where(due | abandoned).order_by(Notification.next_attempt_at).limit(batch_size)
+    if db.session.get_bind().dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    ids = list(db.session.scalars(stmt))
+    if ids:
+        db.session.execute(
+            db.update(Notification)
+            .where(Notification.id.in_(ids))
+            .values(status=Notification.SENDING, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return ids
+
+
+def assignment_link(event_slug: str) -> str:
+    base = (current_app.config.get("SANTA_BASE_URL") or "").rstrip("/")
+    if event_slug == current_app.config["SANTA_DEFAULT_EVENT"]:
+        return f"{base}/auth/login"
+    return f"{base}/auth/login?event={event_slug}"
+
+
+def _build_message(row) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = current_app.config["SMTP_FROM"]
+    msg["To"] = row.email
+    msg["Subject"] = f"{row.event_name}: your Secret Santa assignment is ready"
+    msg.set_content(
+        f"Hi {row.name},\n\n"
+        f"The names for {row.event_name} have been drawn. Log in to see who you're gifting:\n\n"
+        f"  {assignment_link(row.event_slug)}\n\n"
+        "Use the device where your passphrase is saved.\n"
+    )
+    return msg
+
+
+def dispatch_batch(pool: SmtpPool, limiter: RateLimiter, batch_size: int) -> DispatchReport:
+    report = DispatchReport()
+    ids = _claim(batch_size)
+    report.claimed = len(ids)
+    if not ids:
+        return report
+
+    rows = db.session.execute(
+        db.select(
+            Notification.id,
+            Notification.attempts,
+            Participant.email,
+            Participant.name,
+            Event.slug.label("event_slug"),
+            Event.name.label("event_name"),
+        )
+        .join(Participant, Participant.id == Notification.participant_id)
+        .join(Event, Event.id == Notification.event_id)
+        .where(Notification.id.in_(ids))
+    ).all()
+
+    def build(row) -> EmailMessage | Exception:
+        try:
+            return _build_message(row)
+        except Exception as e:  # recorded as this row's failure; the batch carries on
+            return e
+
+    def deliver(msg: EmailMessage | Exception) -> Exception | None:
+        if isinstance(msg, Exception):
+            return msg
+        try:
+            limiter.acquire()
+            pool.send(msg)
+            return None
+        except Exception as e:  # never leave a claimed row in SENDING
+            return e
+
+    # Messages are built here (they need the app config); the threads only talk SMTP.
+    messages = [build(row) for row in rows]
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        outcomes = list(executor.map(deliver, messages))
+
+    max_attempts = current_app.config["SANTA_NOTIFY_MAX_ATTEMPTS"]
+    now = datetime.utcnow()
+    updates = []
+    for row, error in zip(rows, outcomes):
+        attempts = row.attempts + 1
+        if error is None:
+            updates.append({"id": row.id, "status": Notification.SENT, "attempts": attempts, "sent_at": now, "last_error": None})
+            report.sent += 1
+        elif _is_permanent(error) or attempts >= max_attempts:
+            updates.append({"id": row.id, "status": Notification.FAILED, "attempts": attempts, "last_error": repr(error)[:1000]})
+            report.failed += 1
+        else:
+            delay = min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1))
+            updates.append({
+                "id": row.id,
+                "status": Notification.PENDING,
+                "attempts": attempts,
+                "next_attempt_at": now + delay,
+                "last_error": repr(error)[:1000],
+            })
+            report.retried += 1
+    # Only rows still ours: one cancelled meanwhile stays cancelled.
+    db.session.execute(
+        db.update(Notification)
+        .where(Notification.status == Notification.SENDING)
+        .execution_options(synchronize_session=None),
+        updates,
+    )
+    db.session.commit()
+    return report
+
+
+def run_sender(
+    batch_size: int = 100,
+    once: bool = False,
+    idle_seconds: float = 5.0,
+    rate: float | None = None,
+    connections: int | None = None,
+    on_batch: Callable[[DispatchReport], None] | None = None,
+) -> DispatchReport:
+    """Drain the outbox (once=True) or keep polling it; returns the totals."""
+    config = current_app.config
+    pool = SmtpPool(config, connections or config["SANTA_NOTIFY_CONNECTIONS"])
+    limiter = RateLimiter(config["SANTA_NOTIFY_RATE"] if rate is None else rate)
+    total = DispatchReport()
+    try:
+        while True:
+            report = dispatch_batch(pool, limiter, batch_size)
+            for field in ("claimed", "sent", "retried", "failed"):
+                setattr(total, field, getattr(total, field) + getattr(report, field))
+            if report.claimed and on_batch:
+                on_batch(report)
+            if report.claimed < batch_size:
+                if once:
+                    return total
+                time.sleep(idle_seconds)
+    finally:
+        pool.close()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from ..extensions import db
+from ..models import AssignmentState, Exclusion, Participant
+from ..security import hash_client_key
+from .assignments import unset_and_unlock_assignments
+
+
+# ---------------------------------------------------------------------------
+# Admin actions on one participant
+#
+# Shared by the admin pages (default event) and the CLI (`flask santa
+# reset-passphrase` / `remove-participant`, any event). Both bump the event's
+# state version: cached pages and in-flight assignment runs must see them.
+# ---------------------------------------------------------------------------
+
+
+class ParticipantNotFound(LookupError):
+    pass
+
+
+def participant_by_name(event_id: int, name: str) -> Participant:
+    p = db.session.scalar(db.select(Participant).where(Participant.event_id == event_id, Participant.name == name))
+    if p is None:
+        raise ParticipantNotFound(f"No participant named {name!r} in this event.")
+    return p
+
+
+def reset_passphrase(p: Participant, client_hash: str) -> None:
+    """Temporary passphrase (as its client hash); they must change it on first login."""
+    p.passkey_hash = hash_client_key(client_hash)
+    p.must_change_passphrase = True
+    p.reset_requested = False
+    # Invalidates cached pages: their 304 is answered before the
+    # must-change-passphrase redirect would run.
+    AssignmentState.get_singleton(p.event_id).bump_version()
+    db.session.commit()
+
+
+def remove_participant(p: Participant) -> bool:
+    """Deletes `p` and their exclusions; returns True if locked assignments had to be unset first."""
+    unlocked = False
+    if AssignmentState.get_singleton(p.event_id).is_locked:
+        unset_and_unlock_assignments(p.event_id)
+        unlocked = True
+
+    # Clean up directed exclusions involving this user
+    Exclusion.query.filter(
+        Exclusion.event_id == p.event_id,
+        (Exclusion.giver_id == p.id) | (Exclusion.receiver_id == p.id),
+    ).delete(synchronize_session=False)
+
+    # Clear any assignments pointing to this person (defensive)
+    Participant.query.filter_by(event_id=p.event_id, assigned_to_id=p.id).update(
+        {"assigned_to_id": None}, synchronize_session=False
+    )
+
+    db.session.delete(p)
+    AssignmentState.get_singleton(p.event_id).bump_version()
+    db.session.commit()
+    return unlocked
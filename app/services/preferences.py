@@ -1,33 +1,57 @@
 from __future__ import annotations
 
+from ..coordination import StateChanged, claim_unlocked, lock_event_for_write
 from ..extensions import db
 from ..models import Exclusion
 
 
-def get_user_preferences(user_id: int) -> tuple[set[int], set[int]]:
+class PreferencesLocked(RuntimeError):
+    pass
+
+
+def get_user_preferences(event_id: int, user_id: int) -> tuple[set[int], set[int]]:
     """
     Returns:
       outgoing = {receiver_id} that user cannot gift to
       incoming = {giver_id} that cannot gift to user
     """
-    outgoing = {e.receiver_id for e in Exclusion.query.filter_by(giver_id=user_id).all()}
-    incoming = {e.giver_id for e in Exclusion.query.filter_by(receiver_id=user_id).all()}
+    rows = db.session.query(Exclusion.giver_id, Exclusion.receiver_id).filter(
+        Exclusion.event_id == event_id,
+        (Exclusion.giver_id == user_id) | (Exclusion.receiver_id == user_id),
+    )
+    outgoing: set[int] = set()
+    incoming: set[int] = set()
+    for giver_id, receiver_id in rows:
+        if giver_id == user_id:
+            outgoing.add(receiver_id)
+        if receiver_id == user_id:
+            incoming.add(giver_id)
     return outgoing, incoming
 
 
-def set_user_preferences(user_id: int, dont_gift_to: set[int], dont_receive_from: set[int]) -> None:
+def set_user_preferences(event_id: int, user_id: int, dont_gift_to: set[int], dont_receive_from: set[int]) -> None:
     """
     Persists:
       user_id -> rid exclusions for dont_gift_to
       gid -> user_id exclusions for dont_receive_from
-    """
-    Exclusion.query.filter_by(giver_id=user_id).delete()
-    for rid in dont_gift_to:
-        db.session.add(Exclusion(giver_id=user_id, receiver_id=rid))
 
-    Exclusion.query.filter_by(receiver_id=user_id).delete()
-    for gid in dont_receive_from:
-        db.session.add(Exclusion(giver_id=gid, receiver_id=user_id))
+    Raises PreferencesLocked if the event got locked after the caller checked;
+    bumping the version makes any run that read the old exclusions retry.
+    """
+    lock_event_for_write(event_id)
+    try:
+        claim_unlocked(event_id)
+    except StateChanged as e:
+        raise PreferencesLocked("Assignments are locked.") from e
+
+    Exclusion.query.filter_by(event_id=event_id, giver_id=user_id).delete()
+    Exclusion.query.filter_by(event_id=event_id, receiver_id=user_id).delete()
+
+    # One executemany instead of an INSERT ... RETURNING per row.
+    rows = [{"event_id": event_id, "giver_id": user_id, "receiver_id": rid} for rid in dont_gift_to]
+    rows += [{"event_id": event_id, "giver_id": gid, "receiver_id": user_id} for gid in dont_receive_from]
+    if rows:
+        db.session.execute(db.insert(Exclusion), rows)
 
     db.session.commit()
 
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from sqlalchemy.orm import aliased
+
+from ..extensions import db
+from ..models import Participant
+from .streaming import csv_pieces
+
+
+# ---------------------------------------------------------------------------
+# Admin roster queries
+#
+# Always within one event. Keyset pagination on (name, id): each page is "the next PAGE_SIZE rows after
+# the last one shown", so page 500 costs the same as page 1 (no OFFSET scan).
+# Only the columns the tables render are selected; uq_participants_event_name
+# (event_id, name) serves the filter, the prefix search and the ordering. The
+# prefix search is a name range (prefix <= name < next prefix), not LIKE: SQLite's
+# case-insensitive LIKE and LIKE under a non-C Postgres collation can't use the
+# index. The range is only exact in code-point order, so on Postgres it compares
+# name COLLATE "C" (served by ix_participants_event_name_c); SQLite's BINARY
+# default already is. Matching is case-sensitive, like logins.
+# ---------------------------------------------------------------------------
+
+PAGE_SIZE = 50
+EXPORT_BATCH = 2000
+EXPORT_COLUMNS = ["id", "name", "email", "registered_at", "reset_requested", "must_change_passphrase"]
+
+
+def _prefix_upper(prefix: str) -> str | None:
+    """Smallest string above every string starting with `prefix` (None: no bound)."""
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return _prefix_upper(prefix[:-1]) if len(prefix) > 1 else None
+    return prefix[:-1] + chr(last + 1)
+
+
+def _name_in_code_point_order():
+    if db.session.get_bind().dialect.name == "postgresql":
+        return Participant.name.collate("C")
+    return Participant.name
+
+
+def _page(stmt, event_id: int, prefix: str, after: tuple[str, int] | None, limit: int):
+    stmt = stmt.where(Participant.event_id == event_id)
+    if prefix:
+        name = _name_in_code_point_order()
+        stmt = stmt.where(name >= prefix)
+        upper = _prefix_upper(prefix)
+        if upper is not None:
+            stmt = stmt.where(name < upper)
+    if after:
+        stmt = stmt.where(db.tuple_(Participant.name, Participant.id) > db.tuple_(*after))
+    rows = db.session.execute(
+        stmt.order_by(Participant.name.asc(), Participant.id.asc()).limit(limit + 1)
+    ).all()
+    next_after = (rows[limit - 1].name, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_after
+
+
+def participants_page(event_id: int, prefix: str = "", after: tuple[str, int] | None = None, limit: int = PAGE_SIZE):
+    """Returns (rows, next_after). Rows: id, name, reset_requested, assigned_to_name."""
+    assigned = aliased(Participant)
+    stmt = (
+        db.select(
+            Participant.id,
+            Participant.name,
+            Participant.reset_requested,
+            assigned.name.label("assigned_to_name"),
+        )
+        .outerjoin(assigned, Participant.assigned_to_id == assigned.id)
+    )
+    return _page(stmt, event_id, prefix, after, limit)
+
+
+def pending_resets_page(event_id: int, prefix: str = "", after: tuple[str, int] | None = None, limit: int = PAGE_SIZE):
+    """Returns (rows, next_after). Rows: id, name."""
+    stmt = db.select(Participant.id, Participant.name).where(Participant.reset_requested.is_(True))
+    return _page(stmt, event_id, prefix, after, limit)
+
+
+def export_roster_csv(event_id: int) -> Iterator[str]:
+    columns = [getattr(Participant, c) for c in EXPORT_COLUMNS]
+    stmt = (
+        db.select(*columns)
+        .where(Participant.event_id == event_id)
+        .order_by(Participant.name.asc(), Participant.id.asc())
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    return csv_pieces(db.session.execute(stmt), header=EXPORT_COLUMNS)
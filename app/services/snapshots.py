@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Callable, Iterator
+
+from flask import current_app
+from sqlalchemy import inspect
+
+from ..coordination import graph_snapshot
+from ..extensions import db
+
+
+# ---------------------------------------------------------------------------
+# Snapshot / restore (moving a whole database: SQLite dev -> Postgres, or to
+# a fresh free-tier database)
+#
+# Archive: gzip'd JSON lines.
+#   {"format": "secret-santa-snapshot", "version": 1, "revision": ..., ...}
+#   {"table": "participants", "columns": ["id", "event_id", ...]}
+#   [1, 1, "alice", ...]                  one JSON array per row
+#   {"end": "participants", "rows": 20000}
+#   ... (every table in FK order) ...
+#   {"complete": true}
+# Columns are named once per table, rows are bare arrays, so the archive stays
+# small; a missing trailer means a truncated file and the restore is refused.
+#
+# Snapshot reads every table from one consistent snapshot (graph_snapshot),
+# streamed through a server-side cursor. Restore needs an empty, migrated
+# database at the same revision (only the empty default event the migrations
+# seed is replaced), and the web service stopped or restarted after: workers
+# cache event ids. It keeps ids and ciphertexts as they are (the target needs
+# the same ASSIGNMENT_ENC_KEY or SECRET_KEY to read them), loads each table with
+# one COPY on Postgres (or batched executemany elsewhere), resets the id
+# sequences and commits once: a failed restore leaves the target empty.
+# ---------------------------------------------------------------------------
+
+FORMAT = "secret-santa-snapshot"
+FORMAT_VERSION = 1
+TABLES = ("events", "participants", "exclusions", "assignment_state", "notifications")
+READ_BATCH = 5000
+INSERT_BATCH = 5000
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+@dataclass
+class SnapshotReport:
+    tables: dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(self.tables.values())
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _revision(conn) -> str | None:
+    if not inspect(conn).has_table("alembic_version"):
+        return None
+    return conn.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+# --------- Snapshot ----------
+
+def write_snapshot(dest: IO[bytes], on_table: Callable[[str, int], None] | None = None) -> SnapshotReport:
+    report = SnapshotReport()
+    started = time.perf_counter()
+    with gzip.GzipFile(fileobj=dest, mode="wb", compresslevel=6) as gz, \
+            io.TextIOWrapper(gz, encoding="utf-8", newline="\n") as out, \
+            graph_snapshot() as conn:
+
+        def line(record) -> None:
+            out.write(json.dumps(record, default=_json_default, separators=(",", ":")) + "\n")
+
+        line({
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "revision": _revision(conn),
+            "dialect": conn.dialect.name,
+            "created_at": datetime.utcnow().isoformat(),
+        })
+        for name in TABLES:
+            table = db.metadata.tables[name]
+            columns = [c.name for c in table.columns]
+            line({"table": name, "columns": columns})
+            rows = conn.execute(
+                db.select(table).order_by(*table.primary_key.columns).execution_options(yield_per=READ_BATCH)
+            )
+            n = 0
+            for row in rows:
+                line(list(row))
+                n += 1
+            line({"end": name, "rows": n})
+            report.tables[name] = n
+            if on_table:
+                on_table(name, n)
+        line({"complete": True})
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# --------- Restore ----------
+
+class _Archive:
+    """Line reader over the archive that knows where it is."""
+
+    def __init__(self, source: IO[bytes]) -> None:
+        self._lines = io.TextIOWrapper(gzip.GzipFile(fileobj=source, mode="rb"), encoding="utf-8")
+        self.lineno = 0
+
+    def next(self):
+        raw = self._lines.readline()
+        if not raw:
+            raise SnapshotError("Archive is truncated.")
+        self.lineno += 1
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            raise SnapshotError(f"line {self.lineno}: not valid JSON") from e
+
+    def rows(self, table: str, width: int) -> Iterator[list]:
+        """Row arrays up to (and checked against) the table's trailer."""
+        n = 0
+        while True:
+            record = self.next()
+            if isinstance(record, dict):
+                if record.get("end") != table or record.get("rows") != n:
+                    raise SnapshotError(f"line {self.lineno}: {table} section ends unexpectedly after {n} rows")
+                return
+            if len(record) != width:
+                raise SnapshotError(f"line {self.lineno}: expected {width} values, got {len(record)}")
+            n += 1
+            yield record
+
+
+def _copy_field(value) -> str:
+    # COPY ... CSV: unquoted empty is NULL, anything quoted is a value.
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like CSV view of a row iterator, so one COPY streams a whole table."""
+
+    def __init__(self, rows: Iterator[list]) -> None:
+        self._rows = rows
+        self._buf = ""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buf += ",".join(_copy_field(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self._buf)
+        piece, self._buf = self._buf[:size], self._buf[size:]
+        return piece
+
+
+def _decoders(table, columns: list[str]) -> list[Callable | None]:
+    return [
+        (lambda v: v if v is None else datetime.fromisoformat(v))
+        if isinstance(table.c[name].type, db.DateTime) else None
+        for name in columns
+    ]
+
+
+def _insert_rows(conn, table, columns: list[str], rows: Iterator[list]) -> int:
+    decoders = _decoders(table, columns)
+    stmt = table.insert()
+    n = 0
+    batch = []
+    for row in rows:
+        batch.append({
+            name: (decode(value) if decode else value)
+            for name, decode, value in zip(columns, decoders, row)
+        })
+        if len(batch) >= INSERT_BATCH:
+            conn.execute(stmt, batch)
+            n += len(batch)
+            batch = []
+    if batch:
+        conn.execute(stmt, batch)
+        n += len(batch)
+    return n
+
+
+def _copy_rows(conn, table, columns: list[str], rows: Iterator[list]) -> int:
+    stream = _CopyStream(rows)
+    quoted = ", ".join(conn.dialect.identifier_preparer.quote(c) for c in columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({quoted}) FROM STDIN WITH (FORMAT csv)", stream)
+    finally:
+        cursor.close()
+    return stream.count
+
+
+def _reset_sequences(conn) -> None:
+    for name in TABLES:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {name}"
+        )
+
+
+def _clear_placeholders(conn) -> None:
+    """
+    The target must hold no data. The only row allowed is the empty default
+    event the migrations seed; it makes way for the archive's events. Anything
+    else could already be cached by running web workers (tenancy.py caches
+    event ids for good), so it is refused rather than replaced.
+    """
+    for name in TABLES:
+        if not inspect(conn).has_table(name):
+            raise SnapshotError(f"Table {name} is missing; run `flask db upgrade` first.")
+    for name in ("participants", "exclusions", "notifications"):
+        if conn.execute(db.select(db.literal(1)).select_from(db.metadata.tables[name]).limit(1)).first():
+            raise SnapshotError(f"Table {name} is not empty; restore needs an empty database.")
+    events = db.metadata.tables["events"]
+    default_slug = current_app.config["SANTA_DEFAULT_EVENT"]
+    others = list(conn.scalars(db.select(events.c.slug).where(events.c.slug != default_slug).limit(5)))
+    if others:
+        raise SnapshotError(f"This database already has events ({', '.join(others)}); restore needs an empty database.")
+    conn.execute(db.metadata.tables["assignment_state"].delete())
+    conn.execute(events.delete())
+
+
+def restore_snapshot(source: IO[bytes], on_table: Callable[[str, int], None] | None = None) -> SnapshotReport:
+    archive = _Archive(source)
+    header = archive.next()
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise SnapshotError("Not a secret-santa snapshot.")
+    if header.get("version") != FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot format version {header.get('version')} is not supported (expected {FORMAT_VERSION}).")
+
+    report = SnapshotReport()
+    started = time.perf_counter()
+    with db.engine.begin() as conn:
+        target_revision = _revision(conn)
+        if header.get("revision") and target_revision and header["revision"] != target_revision:
+            raise SnapshotError(
+                f"Snapshot is at migration {header['revision']}, this database at {target_revision}; "
+                "upgrade both to the same revision first."
+            )
+        _clear_placeholders(conn)
+
+        copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+        for name in TABLES:
+            section = archive.next()
+            if not isinstance(section, dict) or section.get("table") != name:
+                raise SnapshotError(f"line {archive.lineno}: expected the {name} table")
+            table = db.metadata.tables[name]
+            columns = section["columns"]
+            unknown = [c for c in columns if c not in table.c]
+            if unknown:
+                raise SnapshotError(f"{name}: columns {unknown} don't exist here; upgrade this database first.")
+            rows = archive.rows(name, len(columns))
+            n = (_copy_rows if copy else _insert_rows)(conn, table, columns, rows)
+            report.tables[name] = n
+            if on_table:
+                on_table(name, n)
+
+        if archive.next() != {"complete": True}:
+            raise SnapshotError(f"line {archive.lineno}: expected the end of the archive")
+        if conn.dialect.name == "postgresql":
+            _reset_sequences(conn)
+    report.seconds = time.perf_counter() - started
+    return report
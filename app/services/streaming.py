@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+FLUSH_BYTES = 64 * 1024
+
+
+def csv_pieces(rows: Iterable[Iterable], header: list[str] | None = None) -> Iterator[str]:
+    """Encode rows as CSV, yielded in ~64KB pieces (not one write per row)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def jsonl_pieces(records: Iterable[dict]) -> Iterator[str]:
+    buf = io.StringIO()
+    for record in records:
+        buf.write(json.dumps(record, default=str) + "\n")
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+from flask import Flask, abort, current_app, g, has_request_context, request, session
+
+from .extensions import db
+from .models import Event
+
+
+# ---------------------------------------------------------------------------
+# Events (tenancy)
+#
+# Participants, exclusions and the assignment state all belong to one event,
+# and every query filters on event_id. The current event of a request is:
+#   1. the event the session logged in to (a login is bound to one event),
+#   2. otherwise ?event=<slug> (anonymous pages: landing, register, login),
+#   3. otherwise the default event (SANTA_DEFAULT_EVENT, created on demand).
+# url_for() carries ?event= along on public/auth links, so an anonymous visitor
+# stays in the event they arrived at.
+#
+# Event rows are tiny and never change once created, so they are cached per
+# process by id and by slug: resolving the event costs no query once warm.
+# ---------------------------------------------------------------------------
+
+SESSION_KEY = "santa_event_id"
+EVENT_ARG = "event"
+_CACHE_MAX = 10_000
+
+
+class EventInfo(NamedTuple):
+    id: int
+    slug: str
+    name: str
+
+
+_by_id: dict[int, EventInfo] = {}
+_by_slug: dict[str, EventInfo] = {}
+
+
+def _remember(info: EventInfo) -> EventInfo:
+    if len(_by_id) >= _CACHE_MAX:
+        _by_id.clear()
+        _by_slug.clear()
+    _by_id[info.id] = info
+    _by_slug[info.slug] = info
+    return info
+
+
+def _load(*criteria) -> EventInfo | None:
+    row = db.session.execute(db.select(Event.id, Event.slug, Event.name).where(*criteria)).first()
+    return _remember(EventInfo(*row)) if row else None
+
+
+def event_by_slug(slug: str) -> EventInfo | None:
+    return _by_slug.get(slug) or _load(Event.slug == slug)
+
+
+def event_by_id(event_id: int) -> EventInfo | None:
+    return _by_id.get(event_id) or _load(Event.id == event_id)
+
+
+def default_event() -> EventInfo:
+    slug = current_app.config["SANTA_DEFAULT_EVENT"]
+    info = event_by_slug(slug)
+    if info is None:
+        from .services.events import ensure_event
+
+        info = event_by_id(ensure_event(slug))
+    return info
+
+
+def current_event() -> EventInfo:
+    """The request's event; outside requests (CLI), the default unless use_event() chose one."""
+    if "santa_event" not in g:
+        g.santa_event = default_event()
+    return g.santa_event
+
+
+def current_event_id() -> int:
+    return current_event().id
+
+
+def use_event(info: EventInfo) -> None:
+    """Scope the rest of this app context (e.g. a CLI command) to one event."""
+    g.santa_event = info
+    g.pop("santa_states", None)
+
+
+def bind_session_to_event(event_id: int) -> None:
+    """Called at login."""
+    session[SESSION_KEY] = event_id
+
+
+def unbind_session_event() -> dict:
+    """Called at logout; returns url_for() args that keep the visitor in the same event."""
+    session.pop(SESSION_KEY, None)
+    slug = current_event().slug
+    return {} if slug == current_app.config["SANTA_DEFAULT_EVENT"] else {EVENT_ARG: slug}
+
+
+# --------- Request hooks ----------
+
+def _resolve_event() -> None:
+    event_id = session.get(SESSION_KEY) if "_user_id" in session else None
+    if event_id is not None:
+        info = event_by_id(event_id)
+    elif slug := request.args.get(EVENT_ARG):
+        info = event_by_slug(slug)
+        if info is None:
+            abort(404)
+        g.santa_event_from_url = True
+    else:
+        info = None
+    g.santa_event = info or default_event()
+
+
+def _carry_event_in_urls(endpoint: str, values: dict) -> None:
+    if not has_request_context() or not g.get("santa_event_from_url"):
+        return
+    if endpoint.split(".", 1)[0] in {"public", "auth"}:
+        values.setdefault(EVENT_ARG, g.santa_event.slug)
+
+
+def init_tenancy(app: Flask) -> None:
+    # Registered before the metrics/query-budget hooks: a cold slug lookup is
+    # a once-per-process cache fill, not work the view should be charged for.
+    app.before_request(_resolve_event)
+    app.url_defaults(_carry_event_in_urls)
@@ -5,14 +5,17 @@ from flask.views import MethodView
 from flask_login import login_user, logout_user, current_user
 
 from ..extensions import db
-from ..models import Participant
+from ..models import Participant, AssignmentState
 from ..security import hash_client_key, verify_client_key
+from ..tenancy import bind_session_to_event, current_event_id, unbind_session_event
 
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
 
 class RegisterView(MethodView):
+    query_budget = {"GET": 1, "POST": 4}
+
     def get(self):
         if current_user.is_authenticated:
             return redirect(url_for("santa.dashboard"))
@@ -34,7 +37,8 @@ class RegisterView(MethodView):
             flash("Missing passphrase hash. Please refresh and try again.", "error")
             return render_template("auth/register.html")
 
-        if Participant.query.filter_by(name=name).first():
+        event_id = current_event_id()
+        if Participant.query.filter_by(event_id=event_id, name=name).first():
             flash(f"{name} is already registered.", "error")
             return render_template("auth/register.html")
 
@@ -43,11 +47,13 @@ class RegisterView(MethodView):
         #    return render_template("auth/register.html")
 
         p = Participant(
+            event_id=event_id,
             name=name,
             email=email,
             passkey_hash=hash_client_key(client_hash),
         )
         db.session.add(p)
+        AssignmentState.get_singleton(event_id).bump_version()
         db.session.commit()
 
         flash("Registered. You can now log in (this device remembers your passphrase).", "success")
@@ -55,6 +61,8 @@ class RegisterView(MethodView):
 
 
 class LoginView(MethodView):
+    query_budget = {"GET": 1, "POST": 1}
+
     def get(self):
         if current_user.is_authenticated:
             return redirect(url_for("santa.dashboard"))
@@ -71,12 +79,13 @@ class LoginView(MethodView):
             flash("Name is required.", "error")
             return render_template("auth/login.html")
 
-        user = Participant.query.filter_by(name=name).first()
+        user = Participant.query.filter_by(event_id=current_event_id(), name=name).first()
         if not user or not client_hash or not verify_client_key(client_hash, user.passkey_hash):
             flash("Bad Santa! Invalid name or this device does not have the correct saved passphrase.", "error")
             return render_template("auth/login.html")
 
         login_user(user)
+        bind_session_to_event(user.event_id)
 
         # If the admin issued a temporary passphrase, force change on first use.
         if getattr(user, "must_change_passphrase", False):
@@ -86,23 +95,27 @@ class LoginView(MethodView):
 
 
 class LogoutView(MethodView):
+    query_budget = 1
+
     def get(self):
         if current_user.is_authenticated:
             logout_user()
-        return redirect(url_for("auth.login"))
+        return redirect(url_for("auth.login", **unbind_session_event()))
 
 
 class RequestResetView(MethodView):
     """
     User requests reset by name; admin confirms identity offline and performs reset.
     """
+    query_budget = 2
+
     def post(self):
         name = (request.form.get("name") or "").strip()
         if not name:
             flash("Name is required to request reset.", "error")
             return redirect(url_for("auth.login"))
 
-        p = Participant.query.filter_by(name=name).first()
+        p = Participant.query.filter_by(event_id=current_event_id(), name=name).first()
         if not p:
             flash(f"Unknown Santa: {name}", "error")
             return redirect(url_for("auth.login"))
@@ -117,6 +130,8 @@ class ChangePassphraseView(MethodView):
     Used after logging in with a temporary passphrase (or anytime user wants to rotate).
     Uses the SAME UI pattern as register: generated phrase or manual entry.
     """
+    query_budget = {"GET": 2, "POST": 2}
+
     def get(self):
         if not current_user.is_authenticated:
             return redirect(url_for("auth.login"))
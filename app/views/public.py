@@ -1,24 +1,39 @@
 from __future__ import annotations
 
-from flask import Blueprint, render_template
+from flask import Blueprint, abort, redirect, render_template, url_for
 from flask.views import MethodView
 
+from ..http_cache import ConditionalGetMixin
 from ..models import AssignmentState, Participant
+from ..tenancy import EVENT_ARG, current_event_id, event_by_slug
 
 
 public_bp = Blueprint("public", __name__)
 
 
-class LandingView(MethodView):
+class LandingView(ConditionalGetMixin, MethodView):
+    query_budget = 3
+
     def get(self):
         state = AssignmentState.get_singleton()
         return render_template(
             "landing.html",
             registration_closed=state.is_locked,
             assignment_run_at=state.run_at,
-            num_participants=Participant.query.count(),
+            num_participants=Participant.query.filter_by(event_id=current_event_id()).count(),
         )
 
 
+class EventLinkView(MethodView):
+    """Short shareable link: /e/<slug> -> the event's landing page."""
+    query_budget = 1
+
+    def get(self, slug: str):
+        if event_by_slug(slug) is None:
+            abort(404)
+        return redirect(url_for("public.landing", **{EVENT_ARG: slug}))
+
+
 public_bp.add_url_rule("/", view_func=LandingView.as_view("landing"))
+public_bp.add_url_rule("/e/<slug>", view_func=EventLinkView.as_view("event_link"))
 
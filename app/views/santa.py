@@ -1,23 +1,60 @@
 from __future__ import annotations
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+import csv
+import io
+
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, abort, stream_with_context
 from flask_login import current_user
 
 from ..extensions import db
-from ..models import Participant, AssignmentState, Exclusion
-from ..policies import LoginRequiredMixin, AdminRequiredMixin, ViewOnlyWhenLockedMixin, is_admin_user, assignments_locked
+from ..models import Participant, AssignmentState
+from ..http_cache import ConditionalGetMixin
+from ..metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics, scrape_token_ok
+from ..policies import (
+    LoginRequiredMixin,
+    AdminRequiredMixin,
+    ViewOnlyWhenLockedMixin,
+    assignments_locked,
+    event_admin_name,
+    is_admin_user,
+)
 from ..services.assignments import run_and_lock_assignments, unset_and_unlock_assignments, AssignmentError
-from ..services.preferences import get_user_preferences, set_user_preferences
+from ..services.exclusions import ExclusionImportError, export_exclusions, import_exclusions
+from ..services.imports import detect_format, iter_records
+from ..services.participants import remove_participant, reset_passphrase
+from ..services.preferences import PreferencesLocked, get_user_preferences, set_user_preferences
+from ..services.roster import export_roster_csv, participants_page, pending_resets_page
 from ..security import decrypt_assignment_recipient
+from ..tenancy import current_event_id
 
 santa_bp = Blueprint("santa", __name__)
 
 
+def _keyset_args() -> tuple[str, tuple[str, int] | None]:
+    """?q=<name prefix>&after_name=..&after_id=.. -> (prefix, cursor)."""
+    prefix = (request.args.get("q") or "").strip()
+    after_name = request.args.get("after_name")
+    after_id = request.args.get("after_id", type=int)
+    after = (after_name, after_id) if after_name is not None and after_id is not None else None
+    return prefix, after
+
+
+def _participant_or_404(participant_id: int) -> Participant:
+    """Participant by id, but only inside the current event."""
+    return db.first_or_404(
+        db.select(Participant).where(Participant.id == participant_id, Participant.event_id == current_event_id())
+    )
+
+
 class DashboardView(LoginRequiredMixin):
+    query_budget = 3
+
     def get(self):
         state = AssignmentState.get_singleton()
-        num_participants = Participant.query.count()
-        reset_count = Participant.query.filter_by(reset_requested=True).count()
+        num_participants, reset_count = db.session.query(
+            db.func.count(Participant.id),
+            db.func.count(db.case((Participant.reset_requested.is_(True), 1))),
+        ).filter(Participant.event_id == state.event_id).one()
         return render_template(
             "santa/dashboard.html",
             assignment_locked=state.is_locked,
@@ -28,7 +65,10 @@ class DashboardView(LoginRequiredMixin):
         )
 
 
-class MyAssignmentView(LoginRequiredMixin):
+class MyAssignmentView(ConditionalGetMixin, LoginRequiredMixin):
+    """Immutable for a given user while assignments are locked -> conditional GET."""
+    query_budget = 4
+
     def get(self):
         token = getattr(current_user, "assigned_to_ciphertext", None)
         if not token:
@@ -41,8 +81,8 @@ class MyAssignmentView(LoginRequiredMixin):
             flash("Could not decrypt your assignment. Please ask the admin to unset and rerun assignments.", "error")
             return redirect(url_for("santa.dashboard"))
 
-        assigned_to = Participant.query.get(receiver_id)
-        if not assigned_to:
+        assigned_to = db.session.get(Participant, receiver_id)
+        if not assigned_to or assigned_to.event_id != current_user.event_id:
             flash("Your assigned recipient no longer exists. Please ask the admin to rerun assignments.", "error")
             return redirect(url_for("santa.dashboard"))
 
@@ -50,18 +90,21 @@ class MyAssignmentView(LoginRequiredMixin):
 
 
 class PreferencesView(ViewOnlyWhenLockedMixin):
+    # POST: lock + "still unlocked" version bump, then the exclusion rewrite
+    query_budget = {"GET": 4, "POST": 8}
+
     def get(self):
         state = AssignmentState.get_singleton()
         locked = state.is_locked
 
-        admin_name = (current_app.config.get("SANTA_ADMIN_NAME") or "").strip()
-        q = Participant.query
+        admin_name = event_admin_name(current_user.event_id)
+        q = Participant.query.filter_by(event_id=current_user.event_id)
         if admin_name:
             q = q.filter(Participant.name != admin_name)
         candidates = q.order_by(Participant.name.asc()).all()
         candidates = [p for p in candidates if p.id != current_user.id]
 
-        outgoing, incoming = get_user_preferences(current_user.id)
+        outgoing, incoming = get_user_preferences(current_user.event_id, current_user.id)
 
         return render_template(
             "santa/preferences.html",
@@ -74,8 +117,8 @@ class PreferencesView(ViewOnlyWhenLockedMixin):
 
     def post(self):
         # ViewOnlyWhenLockedMixin blocks POST when locked
-        admin_name = (current_app.config.get("SANTA_ADMIN_NAME") or "").strip()
-        q = Participant.query
+        admin_name = event_admin_name(current_user.event_id)
+        q = Participant.query.filter_by(event_id=current_user.event_id)
         if admin_name:
             q = q.filter(Participant.name != admin_name)
         candidates = q.all()
@@ -86,15 +129,22 @@ class PreferencesView(ViewOnlyWhenLockedMixin):
         dont_gift_to = {i for i in dont_gift_to if i in valid_ids}
         dont_receive_from = {i for i in dont_receive_from if i in valid_ids}
 
-        set_user_preferences(current_user.id, dont_gift_to, dont_receive_from)
+        try:
+            set_user_preferences(current_user.event_id, current_user.id, dont_gift_to, dont_receive_from)
+        except PreferencesLocked:
+            flash("This is view-only because assignments are locked.", "info")
+            return redirect(url_for("santa.preferences"))
         flash("Preferences saved.", "success")
         return redirect(url_for("santa.preferences"))
 
 
 class AdminRunAssignmentsView(AdminRequiredMixin):
+    # snapshot (begin + 3 reads), lock, compare-and-swap, one executemany, outbox insert
+    query_budget = 10
+
     def get(self):
         try:
-            run_and_lock_assignments()
+            run_and_lock_assignments(current_event_id())
             flash("Santeess have been assigned and assingments are locked.", "success")
         except AssignmentError as e:
             flash(f"Failed to run assignments: {e}", "error")
@@ -102,80 +152,159 @@ class AdminRunAssignmentsView(AdminRequiredMixin):
 
 
 class AdminUnsetAssignmentsView(AdminRequiredMixin):
+    query_budget = 6
+
     def post(self):
-        unset_and_unlock_assignments()
+        unset_and_unlock_assignments(current_event_id())
         flash("Assignments unset and unlocked. Users can update preferences; you can rerun assignments.", "success")
         return redirect(url_for("santa.dashboard"))
 
 
 class AdminResetsView(AdminRequiredMixin):
+    query_budget = 3
+
     def get(self):
-        pending = Participant.query.filter_by(reset_requested=True).order_by(Participant.name.asc()).all()
-        return render_template("santa/admin_resets.html", pending=pending)
+        prefix, after = _keyset_args()
+        pending, next_after = pending_resets_page(current_event_id(), prefix, after)
+        return render_template(
+            "santa/admin_resets.html",
+            pending=pending,
+            q=prefix,
+            next_after=next_after,
+            paged=after is not None,
+        )
 
 
 class AdminResetPasskeyView(AdminRequiredMixin):
+    # POST: the participant write plus the state version bump (read + update)
+    query_budget = {"GET": 3, "POST": 6}
+
     def get(self, participant_id: int):
-        p = Participant.query.get_or_404(participant_id)
+        p = _participant_or_404(participant_id)
         return render_template("santa/admin_reset_passkey.html", participant=p)
 
     def post(self, participant_id: int):
-        p = Participant.query.get_or_404(participant_id)
+        p = _participant_or_404(participant_id)
         client_hash = (request.form.get("client_hash") or "").strip().lower()
         if not client_hash:
             flash("Missing client hash.", "error")
             return redirect(url_for("santa.admin_reset_passkey", participant_id=participant_id))
 
-        from ..security import hash_client_key  # local import to avoid circulars
-        p.passkey_hash = hash_client_key(client_hash)
-        p.must_change_passphrase = True
-        p.reset_requested = False
-        db.session.commit()
+        reset_passphrase(p, client_hash)
 
         flash(f"Temporary passphrase set for {p.name}. They must change it on first login.", "success")
         return redirect(url_for("santa.admin_resets"))
 
 class AdminDeleteParticipantView(AdminRequiredMixin):
-    def post(self, participant_id: int):
-        # ✅ Auto-unlock if locked
-        if AssignmentState.get_singleton().is_locked:
-            unset_and_unlock_assignments()
-            flash("Assignments were locked — they have been unset & unlocked due to participant deletion.", "info")
+    query_budget = 13
 
-        p = Participant.query.get_or_404(participant_id)
+    def post(self, participant_id: int):
+        p = _participant_or_404(participant_id)
 
         # Prevent deleting the admin account via UI (recommended)
         if is_admin_user() and p.id == current_user.id:
             flash("You cannot delete the admin account while logged in as it.", "error")
             return redirect(url_for("santa.admin_participants"))
 
-        # Clean up directed exclusions involving this user
-        Exclusion.query.filter(
-            (Exclusion.giver_id == p.id) | (Exclusion.receiver_id == p.id)
-        ).delete(synchronize_session=False)
-
-        # Clear any assignments pointing to this person (defensive)
-        Participant.query.filter_by(assigned_to_id=p.id).update(
-            {"assigned_to_id": None}, synchronize_session=False
-        )
-
-        db.session.delete(p)
-        db.session.commit()
+        # ✅ Auto-unlock if locked
+        if remove_participant(p):
+            flash("Assignments were locked — they have been unset & unlocked due to participant deletion.", "info")
 
         flash(f"Deleted participant: {p.name}", "success")
         return redirect(url_for("santa.admin_participants"))
 
 class AdminParticipantsView(AdminRequiredMixin):
+    query_budget = 4
+
     def get(self):
         state = AssignmentState.get_singleton()
-        participants = Participant.query.order_by(Participant.name.asc()).all()
+        prefix, after = _keyset_args()
+        participants, next_after = participants_page(state.event_id, prefix, after)
+        total = db.session.query(db.func.count(Participant.id)).filter(Participant.event_id == state.event_id).scalar()
         return render_template(
             "santa/admin_participants.html",
             participants=participants,
+            total=total,
+            q=prefix,
+            next_after=next_after,
+            paged=after is not None,
             locked=state.is_locked,
         )
 
 
+class AdminParticipantsExportView(AdminRequiredMixin):
+    """Full roster as CSV, streamed off a server-side cursor."""
+    query_budget = 2
+
+    def get(self):
+        return Response(
+            stream_with_context(export_roster_csv(current_event_id())),
+            mimetype="text/csv",
+            headers={"Content-Disposition": "attachment; filename=participants.csv"},
+        )
+
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+class AdminExclusionsExportView(AdminRequiredMixin):
+    """Streams every exclusion as giver/receiver names off a server-side cursor."""
+    query_budget = 3
+
+    def get(self):
+        fmt = request.args.get("format", "csv")
+        if fmt not in EXPORT_MIMETYPES:
+            abort(400)
+        return Response(
+            stream_with_context(export_exclusions(current_event_id(), fmt)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={"Content-Disposition": f"attachment; filename=exclusions.{fmt}"},
+        )
+
+
+class AdminExclusionsImportView(AdminRequiredMixin):
+    # One INSERT per chunk: unbounded by design.
+    query_budget = None
+    query_repeat_limit = None
+
+    def post(self):
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Choose a CSV or JSONL file to import.", "error")
+            return redirect(url_for("santa.admin_participants"))
+
+        fmt = request.form.get("format") or detect_format(upload.filename)
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8", newline="")
+        try:
+            report = import_exclusions(current_event_id(), iter_records(stream, fmt))
+        except (ExclusionImportError, ValueError, csv.Error) as e:
+            flash(f"Exclusion import stopped: {e}", "error")
+            return redirect(url_for("santa.admin_participants"))
+
+        flash(
+            f"Imported {report.inserted} exclusions ({report.existing} already present, "
+            f"{report.unknown} with unknown names, {report.invalid} invalid).",
+            "success",
+        )
+        return redirect(url_for("santa.admin_participants"))
+
+
+class MetricsView(AdminRequiredMixin):
+    """
+    Prometheus text exposition. Admin session, or
+    `Authorization: Bearer $SANTA_METRICS_TOKEN` for a scraper.
+    """
+    query_budget = 1
+
+    def dispatch_request(self, *args, **kwargs):
+        if scrape_token_ok():
+            return self.get()
+        return super().dispatch_request(*args, **kwargs)
+
+    def get(self):
+        return Response(render_metrics(), mimetype=METRICS_CONTENT_TYPE)
+
+
 # Register routes
 santa_bp.add_url_rule("/dashboard", view_func=DashboardView.as_view("dashboard"))
 santa_bp.add_url_rule("/my-assignment", view_func=MyAssignmentView.as_view("my_assignment"))
@@ -188,5 +317,10 @@ santa_bp.add_url_rule("/admin/resets", view_func=AdminResetsView.as_view("admin_
 santa_bp.add_url_rule("/admin/reset-passkey/<int:participant_id>", view_func=AdminResetPasskeyView.as_view("admin_reset_passkey"), methods=["GET", "POST"])
 
 santa_bp.add_url_rule("/admin/participants", view_func=AdminParticipantsView.as_view("admin_participants"))
+santa_bp.add_url_rule("/admin/participants/export.csv", view_func=AdminParticipantsExportView.as_view("admin_participants_export"))
 santa_bp.add_url_rule("/admin/participants/<int:participant_id>/delete", view_func=AdminDeleteParticipantView.as_view("admin_delete_participant"), methods=["POST"])
 
+santa_bp.add_url_rule("/admin/exclusions/export", view_func=AdminExclusionsExportView.as_view("admin_exclusions_export"))
+santa_bp.add_url_rule("/admin/exclusions/import", view_func=AdminExclusionsImportView.as_view("admin_exclusions_import"), methods=["POST"])
+
+santa_bp.add_url_rule("/metrics", view_func=MetricsView.as_view("metrics"))
@@ -0,0 +1,44 @@
+# gunicorn settings for the Render deploy (picked up automatically from the CWD).
+import gc
+import glob
+import os
+import tempfile
+
+# Multiprocess metrics: each worker writes mmap'd files here and /metrics
+# aggregates them. Must exist before prometheus_client is imported, which with
+# preload_app happens before any server hook runs. Stale files from a previous
+# master would be summed into the new totals, so remove them: only
+# prometheus_client's *.db files, the directory may be the operator's.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "santa-metrics"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for stale in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(stale)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+# Build the app once in the master (imports, compiled templates, warmed crypto)
+# and fork workers from it instead of booting each one from scratch.
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers don't touch (and un-share) the preloaded pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never share DB connections across processes; each worker opens its own.
+    from app.extensions import db
+
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():  # primary and read replicas
+            engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
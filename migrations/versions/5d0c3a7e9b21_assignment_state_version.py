@@ -0,0 +1,28 @@
+"""assignment state version for conditional GETs
+
+Revision ID: 5d0c3a7e9b21
+Revises: 339efae9108e
+Create Date: 2026-01-06 10:12:41.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c3a7e9b21'
+down_revision = '339efae9108e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('assignment_state', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('changed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('assignment_state', schema=None) as batch_op:
+        batch_op.drop_column('changed_at')
+        batch_op.drop_column('version')
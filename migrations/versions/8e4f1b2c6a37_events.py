@@ -0,0 +1,88 @@
+"""events: scope participants, exclusions and assignment state per event
+
+Revision ID: 8e4f1b2c6a37
+Revises: 5d0c3a7e9b21
+Create Date: 2026-01-14 09:31:05.118204
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4f1b2c6a37'
+down_revision = '5d0c3a7e9b21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    events = op.create_table('events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slug', sa.String(length=64), nullable=False),
+    sa.Column('name', sa.String(length=128), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_events')),
+    sa.UniqueConstraint('slug', name=op.f('uq_events_slug'))
+    )
+    # Everything that exists today becomes the default event.
+    op.bulk_insert(events, [{'id': 1, 'slug': 'default', 'name': 'Secret Santa', 'created_at': datetime.utcnow()}])
+    op.execute("DELETE FROM assignment_state WHERE id <> (SELECT MIN(id) FROM assignment_state)")
+
+    for table in ('participants', 'exclusions', 'assignment_state'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('event_id', sa.Integer(), nullable=True))
+        op.execute(f"UPDATE {table} SET event_id = 1")
+
+    with op.batch_alter_table('participants', schema=None) as batch_op:
+        batch_op.alter_column('event_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_constraint('uq_participants_name', type_='unique')
+        batch_op.drop_constraint('uq_participants_email', type_='unique')
+        batch_op.create_unique_constraint('uq_participants_event_name', ['event_id', 'name'])
+        batch_op.create_unique_constraint('uq_participants_event_email', ['event_id', 'email'])
+        batch_op.create_index('ix_participants_event_reset', ['event_id', 'reset_requested', 'name'], unique=False)
+        batch_op.create_foreign_key(batch_op.f('fk_participants_event_id_events'), 'events', ['event_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('exclusions', schema=None) as batch_op:
+        batch_op.alter_column('event_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_exclusions_event_receiver', ['event_id', 'receiver_id'], unique=False)
+        batch_op.create_foreign_key(batch_op.f('fk_exclusions_event_id_events'), 'events', ['event_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('assignment_state', schema=None) as batch_op:
+        batch_op.alter_column('event_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_unique_constraint(batch_op.f('uq_assignment_state_event_id'), ['event_id'])
+        batch_op.create_foreign_key(batch_op.f('fk_assignment_state_event_id_events'), 'events', ['event_id'], ['id'], ondelete='CASCADE')
+
+    # Postgres: the explicit id above doesn't advance the sequence.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("SELECT setval(pg_get_serial_sequence('events', 'id'), (SELECT MAX(id) FROM events))")
+
+
+def downgrade():
+    # Only the default event survives a downgrade.
+    op.execute("DELETE FROM exclusions WHERE event_id <> 1")
+    op.execute("DELETE FROM participants WHERE event_id <> 1")
+    op.execute("DELETE FROM assignment_state WHERE event_id <> 1")
+
+    with op.batch_alter_table('assignment_state', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_assignment_state_event_id_events'), type_='foreignkey')
+        batch_op.drop_constraint(batch_op.f('uq_assignment_state_event_id'), type_='unique')
+        batch_op.drop_column('event_id')
+
+    with op.batch_alter_table('exclusions', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_exclusions_event_id_events'), type_='foreignkey')
+        batch_op.drop_index('ix_exclusions_event_receiver')
+        batch_op.drop_column('event_id')
+
+    with op.batch_alter_table('participants', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('fk_participants_event_id_events'), type_='foreignkey')
+        batch_op.drop_index('ix_participants_event_reset')
+        batch_op.drop_constraint('uq_participants_event_email', type_='unique')
+        batch_op.drop_constraint('uq_participants_event_name', type_='unique')
+        batch_op.create_unique_constraint('uq_participants_email', ['email'])
+        batch_op.create_unique_constraint('uq_participants_name', ['name'])
+        batch_op.drop_column('event_id')
+
+    op.drop_table('events')
@@ -0,0 +1,27 @@
+"""C-collated participant name index for the admin prefix search (Postgres only)
+
+Revision ID: d41a6c8f2e95
+Revises: b7d2e9a4c150
+Create Date: 2026-02-03 11:08:52.317640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a6c8f2e95'
+down_revision = 'b7d2e9a4c150'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite compares names with BINARY already; uq_participants_event_name serves it there.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_participants_event_name_c', 'participants', ['event_id', sa.text('name COLLATE "C"')], unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_participants_event_name_c', table_name='participants')
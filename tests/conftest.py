@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from app import create_app, tenancy
+from app.extensions import db
+from app.models import AssignmentState
+
+ADMIN = "admin"
+
+
+def client_hash(passphrase: str) -> str:
+    """What the browser sends in place of the passphrase."""
+    return hashlib.sha256(passphrase.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """create_app() on a fresh SQLite file, with SANTA_QUERY_BUDGETS=<mode> and any extra env."""
+
+    def factory(mode: str = "raise", **env: str):
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/santa.db")
+        monkeypatch.setenv("SANTA_ADMIN_NAME", ADMIN)
+        monkeypatch.setenv("SANTA_QUERY_BUDGETS", mode)
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        # Event ids are cached per process; every test starts a new database.
+        tenancy._by_id.clear()
+        tenancy._by_slug.clear()
+        app = create_app()
+        app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+        with app.app_context():
+            db.create_all(bind_key=None)  # replicas are copies, never created
+            AssignmentState.get_singleton()
+        return app
+
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app("raise")
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def register(client, name: str, passphrase: str | None = None):
+    return client.post("/auth/register", data={"name": name, "client_hash": client_hash(passphrase or name)})
+
+
+def login(client, name: str, passphrase: str | None = None):
+    return client.post("/auth/login", data={"name": name, "client_hash": client_hash(passphrase or name)})
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from app.extensions import db
+from app.models import AssignmentState, Participant
+from app.security import verify_client_key
+from app.services.events import create_event
+from app.services.imports import client_hash_for_passphrase
+
+
+def _london(app) -> int:
+    with app.app_context():
+        event_id = create_event("london").id
+        db.session.add_all(
+            Participant(event_id=event_id, name=name, passkey_hash="x", reset_requested=name == "bob")
+            for name in ("alice", "bob", "carol")
+        )
+        db.session.commit()
+    return event_id
+
+
+def _locked(app, event_id: int) -> bool:
+    with app.app_context():
+        return AssignmentState.get_singleton(event_id).is_locked
+
+
+def test_unlock_and_rerun_another_event(app):
+    event_id = _london(app)
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=["santa", "run-pending", "--event", "london", "--workers", "1"]).exit_code == 0
+    assert _locked(app, event_id)
+
+    result = runner.invoke(args=["santa", "unlock", "--event", "london"])
+    assert result.exit_code == 0, result.output
+    assert not _locked(app, event_id)
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).where(Participant.assigned_to_ciphertext.isnot(None))) == 0
+
+
+def test_complete_a_reset_request(app):
+    event_id = _london(app)
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=["santa", "pending-resets", "--event", "london"]).output.split() == ["bob"]
+
+    result = runner.invoke(args=["santa", "reset-passphrase", "bob", "--event", "london", "--passphrase", "temp words"])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        bob = db.session.scalar(db.select(Participant).where(Participant.event_id == event_id, Participant.name == "bob"))
+        assert bob.must_change_passphrase and not bob.reset_requested
+        assert verify_client_key(client_hash_for_passphrase("temp words"), bob.passkey_hash)
+
+    assert runner.invoke(args=["santa", "reset-passphrase", "nobody", "--event", "london", "--passphrase", "x"]).exit_code == 1
+
+
+def test_remove_participant_unlocks(app):
+    event_id = _london(app)
+    runner = app.test_cli_runner()
+    runner.invoke(args=["santa", "run-pending", "--event", "london", "--workers", "1"])
+
+    result = runner.invoke(args=["santa", "remove-participant", "carol", "--event", "london", "--yes"])
+    assert result.exit_code == 0, result.output
+    assert "unset and unlocked" in result.output
+    assert not _locked(app, event_id)
+    with app.app_context():
+        names = db.session.scalars(db.select(Participant.name).where(Participant.event_id == event_id))
+        assert sorted(names) == ["alice", "bob"]
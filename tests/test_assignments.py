@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from app.coordination import StateChanged, claim_unlocked
+from app.extensions import db
+from app.models import AssignmentState, Exclusion, Notification, Participant
+from app.services import assignments
+from app.services.events import create_event
+
+_solve_pool = assignments.solve_pool
+
+
+def _event(app, slug: str, size: int) -> int:
+    with app.app_context():
+        event_id = create_event(slug).id
+        db.session.add_all(Participant(event_id=event_id, name=f"{slug}{i}", passkey_hash="x") for i in range(size))
+        db.session.commit()
+    return event_id
+
+
+def _locked(app, event_id: int) -> bool:
+    with app.app_context():
+        return AssignmentState.get_singleton(event_id).is_locked
+
+
+# --------- Commit phase ----------
+
+def _change_graph_elsewhere(event_id: int) -> None:
+    """Another worker saves someone's preferences: an exclusion plus a version bump, in its own transaction."""
+    giver, receiver = db.session.scalars(db.select(Participant.id).where(Participant.event_id == event_id).limit(2))
+    with db.engine.begin() as conn:
+        conn.execute(db.insert(Exclusion).values(event_id=event_id, giver_id=giver, receiver_id=receiver))
+        conn.execute(
+            db.update(AssignmentState)
+            .where(AssignmentState.event_id == event_id)
+            .values(version=AssignmentState.version + 1)
+        )
+
+
+def _nothing_stored(event_id: int) -> bool:
+    db.session.rollback()
+    assigned = db.select(db.func.count(Participant.id)).where(
+        Participant.event_id == event_id, Participant.assigned_to_ciphertext.is_not(None)
+    )
+    return (
+        not AssignmentState.get_singleton(event_id).is_locked
+        and db.session.scalar(assigned) == 0
+        and db.session.scalar(db.select(db.func.count(Notification.id))) == 0
+    )
+
+
+def test_a_graph_change_after_the_snapshot_fails_the_claim(app):
+    event_id = _event(app, "race", 4)
+    with app.app_context():
+        version, ids, excluded = assignments._load_pool(event_id)
+        _change_graph_elsewhere(event_id)
+
+        with pytest.raises(StateChanged):
+            claim_unlocked(event_id, expected_version=version, is_locked=True)
+        assert _nothing_stored(event_id)
+
+
+def test_a_run_that_lost_the_race_stores_nothing(app, monkeypatch):
+    event_id = _event(app, "race", 4)
+
+    def solve_while_someone_edits(ids, excluded, seed=None, max_steps=assignments.MAX_SEARCH_STEPS):
+        _change_graph_elsewhere(event_id)
+        return _solve_pool(ids, excluded, seed, max_steps)
+
+    monkeypatch.setattr(assignments, "solve_pool", solve_while_someone_edits)
+    with app.app_context():
+        with pytest.raises(assignments.AssignmentConflict):
+            assignments.run_and_lock_assignments(event_id)
+        assert _nothing_stored(event_id)
+
+
+# --------- Batch runs ----------
+
+def _ciphertexts(app, event_id: int) -> list[str | None]:
+    with app.app_context():
+        return list(db.session.scalars(
+            db.select(Participant.assigned_to_ciphertext).where(Participant.event_id == event_id).order_by(Participant.id)
+        ))
+
+
+def test_too_small_events_are_skipped(app):
+    tiny, big = _event(app, "tiny", 1), _event(app, "big", 4)
+
+    with app.app_context():
+        results = {r.slug: r for r in assignments.run_pending_assignments(workers=1)}
+    assert results["tiny"].status == "skipped" and "at least 2" in results["tiny"].message
+    assert results["big"].status == "assigned"
+    assert not _locked(app, tiny) and _locked(app, big)
+
+
+def test_a_rerun_leaves_locked_events_alone(app, monkeypatch):
+    big = _event(app, "big", 4)
+    with app.app_context():
+        assert [r.status for r in assignments.run_pending_assignments(["big"], workers=1)] == ["assigned"]
+    stored = _ciphertexts(app, big)
+
+    with app.app_context():
+        assert assignments.run_pending_assignments(["big"], workers=1) == []
+        # Listed as pending, then locked by someone else before its pool was read.
+        monkeypatch.setattr(assignments, "pending_events", lambda slugs=None: [(big, "big")])
+        [result] = assignments.run_pending_assignments(workers=1)
+    assert (result.status, result.message) == ("skipped", "locked meanwhile")
+    assert _ciphertexts(app, big) == stored and all(stored)
+
+
+def _crashing_solver(ids, excluded, seed=None, max_steps=assignments.MAX_SEARCH_STEPS):
+    if len(ids) == 3:
+        os._exit(1)  # the solver process dies, as on an OOM kill
+    return _solve_pool(ids, excluded, seed, max_steps)
+
+
+def test_a_dead_solver_process_fails_its_pool_not_the_batch(app, monkeypatch):
+    crash = _event(app, "crash", 3)
+    others = [_event(app, f"e{i}", 4) for i in range(8)]
+    monkeypatch.setattr(assignments, "solve_pool", _crashing_solver)
+
+    with app.app_context():
+        results = {r.slug: r for r in assignments.run_pending_assignments(workers=1)}
+    assert results["crash"].status == "failed"
+    assert "solver process died" in results["crash"].message
+    # Pools submitted after the crash run on a new process pool.
+    assert results["e7"].status == "assigned"
+    assert not _locked(app, crash) and _locked(app, others[-1])
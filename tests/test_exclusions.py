@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from app.extensions import db
+from app.models import Exclusion, Participant
+from app.services.exclusions import import_exclusions
+
+
+def _people(app, *names: str) -> dict[str, int]:
+    with app.app_context():
+        people = [Participant(event_id=1, name=name, passkey_hash="x") for name in names]
+        db.session.add_all(people)
+        db.session.commit()
+        return {p.name: p.id for p in people}
+
+
+def _pairs() -> set[tuple[int, int]]:
+    return {tuple(row) for row in db.session.execute(db.select(Exclusion.giver_id, Exclusion.receiver_id))}
+
+
+@pytest.mark.parametrize("chunk_size", [2, 100])
+def test_import_exclusions_counts(app, chunk_size):
+    ids = _people(app, "alice", "bob", "carol")
+    records = [
+        {"giver": "alice", "receiver": "bob"},  # already stored
+        {"giver": "bob", "receiver": "carol"},
+        {"giver": "bob", "receiver": "carol"},  # repeated in the file
+        {"giver": "alice", "receiver": "zed"},
+        {"giver": "alice", "receiver": "alice"},
+        {"giver": "bob"},
+    ]
+    with app.app_context():
+        db.session.add(Exclusion(event_id=1, giver_id=ids["alice"], receiver_id=ids["bob"]))
+        db.session.commit()
+
+        report = import_exclusions(1, records, chunk_size=chunk_size)
+        assert (report.read, report.inserted, report.existing, report.unknown, report.invalid) == (6, 1, 2, 1, 2)
+        assert _pairs() == {(ids["alice"], ids["bob"]), (ids["bob"], ids["carol"])}
+
+
+def test_cli_import_of_a_malformed_csv_fails(app, tmp_path):
+    _people(app, "alice", "bob")
+    source = tmp_path / "households.csv"
+    # An unclosed quote swallows the rest of the file into one oversized field.
+    source.write_text('giver,receiver\nalice,"bob\n' + "alice,bob\n" * 20000, encoding="utf-8")
+
+    result = app.test_cli_runner().invoke(args=["santa", "import-exclusions", str(source)])
+    assert result.exit_code == 1
+    assert "Exclusion import stopped: field larger than field limit" in result.output
+    with app.app_context():
+        assert _pairs() == set()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from conftest import ADMIN, login, register
+
+
+def _participant_id(client, name: str) -> int:
+    from app.extensions import db
+    from app.models import Participant
+
+    with client.application.app_context():
+        return db.session.scalar(db.select(Participant.id).where(Participant.name == name))
+
+
+def test_revalidates_and_answers_304(client):
+    register(client, "alice")
+    client.get("/")  # shows the "Registered" flash: never cached
+    first = client.get("/")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    register(client, "bob")  # bumps the event version
+    client.get("/")
+    assert client.get("/", headers={"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+
+def test_passphrase_reset_is_not_hidden_behind_a_304(app, client):
+    for name in (ADMIN, "alice", "bob"):
+        register(client, name)
+    login(client, ADMIN)
+    client.get("/admin/run-assignments")
+    member = app.test_client()
+    login(member, "alice")
+    etag = member.get("/my-assignment").headers["ETag"]
+    assert member.get("/my-assignment", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"/admin/reset-passkey/{_participant_id(client, 'alice')}", data={"client_hash": "ab" * 32})
+
+    # Alice's session is still valid, but she must change her passphrase first.
+    response = member.get("/my-assignment", headers={"If-None-Match": etag})
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("/auth/change-passphrase")
+
+
+def test_rebuilt_assets_invalidate_cached_pages(make_app, monkeypatch):
+    from app import assets
+
+    monkeypatch.setattr(assets, "load_manifest", lambda: {"css/app.css": "app.1111.css"})
+    client = make_app().test_client()
+    client.get("/")
+    etag = client.get("/").headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    # `flask santa build-assets` again on the same commit, then a restart.
+    monkeypatch.setattr(assets, "load_manifest", lambda: {"css/app.css": "app.2222.css"})
+    client = make_app().test_client()
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "app.2222.css" in response.get_data(as_text=True)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from app.extensions import db
+from app.models import Participant
+from app.services import imports
+
+
+def _records(*names: str) -> list[dict]:
+    return [{"name": name, "passphrase": f"{name} words"} for name in names]
+
+
+def test_import_participants_counts(app):
+    with app.app_context():
+        db.session.add(Participant(event_id=1, name="alice", passkey_hash="x"))
+        db.session.commit()
+        report = imports.import_participants(1, _records("alice", "bob", "bob", "carol") + [{"name": "dave"}], workers=1)
+        assert (report.read, report.inserted, report.existing, report.duplicates, report.invalid) == (5, 2, 1, 1, 1)
+        assert db.session.scalar(db.select(Participant.must_change_passphrase).where(Participant.name == "bob"))
+
+
+def test_registration_during_import_is_skipped_not_fatal(app, monkeypatch):
+    with app.app_context():
+        # Someone registers "bob" through the web after the chunk's duplicate check.
+        monkeypatch.setattr(imports, "_existing", lambda *args: set())
+        db.session.add(Participant(event_id=1, name="bob", passkey_hash="x"))
+        db.session.commit()
+
+        report = imports.import_participants(1, _records("alice", "bob"), workers=1)
+        assert (report.inserted, report.existing) == (1, 1)
+        assert db.session.scalar(db.select(Participant.passkey_hash).where(Participant.name == "bob")) == "x"
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Notification, Participant
+from app.services import notifications as N
+from app.services.assignments import run_and_lock_assignments, unset_and_unlock_assignments
+
+
+class StandInSmtp(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: counts connections, records deliveries, refuses on demand."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.connections = 0
+        self.delivered: list[str] = []
+        self.rcpt_replies: dict[str, str] = {}
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server = self.server
+        server.connections += 1
+        rcpt = None
+
+        def reply(line: str) -> None:
+            self.wfile.write((line + "\r\n").encode())
+
+        reply("220 stand-in")
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "RCPT":
+                rcpt = command.split("<", 1)[1].split(">", 1)[0]
+                reply(server.rcpt_replies.get(rcpt, "250 ok"))
+            elif verb == "DATA":
+                reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                server.delivered.append(rcpt)
+                reply("250 queued")
+            elif verb == "QUIT":
+                reply("221 bye")
+                return
+            else:  # EHLO, HELO, MAIL, RSET, NOOP
+                reply("250 ok")
+
+
+@pytest.fixture
+def smtp():
+    server = StandInSmtp()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(app, smtp):
+    """Five assigned participants with emails: five queued assignment-ready messages."""
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=smtp.server_address[1], SMTP_SECURITY="none")
+    with app.app_context():
+        db.session.add_all(
+            Participant(event_id=1, name=f"p{i}", email=f"p{i}@example.test", passkey_hash="x") for i in range(5)
+        )
+        db.session.commit()
+        run_and_lock_assignments(1)
+        assert N.notification_counts(1) == {Notification.PENDING: 5}
+        yield app
+
+
+def _dispatch(app, connections: int = 2):
+    pool = N.SmtpPool(app.config, connections)
+    try:
+        return N.dispatch_batch(pool, N.RateLimiter(0), batch_size=100)
+    finally:
+        pool.close()
+
+
+def _row(email: str) -> Notification:
+    return db.session.scalar(
+        db.select(Notification).join(Participant, Participant.id == Notification.participant_id).where(Participant.email == email)
+    )
+
+
+def test_enqueue_dispatch_sent(outbox, smtp):
+    report = _dispatch(outbox)
+    assert (report.claimed, report.sent) == (5, 5)
+    assert sorted(smtp.delivered) == [f"p{i}@example.test" for i in range(5)]
+    assert N.notification_counts(1) == {Notification.SENT: 5}
+    assert _dispatch(outbox).claimed == 0
+
+
+def test_temporary_refusal_backs_off_then_fails(outbox, smtp):
+    outbox.config["SANTA_NOTIFY_MAX_ATTEMPTS"] = 2
+    smtp.rcpt_replies["p3@example.test"] = "451 try again later"
+
+    started = datetime.utcnow()
+    report = _dispatch(outbox)
+    assert (report.sent, report.retried, report.failed) == (4, 1, 0)
+    row = _row("p3@example.test")
+    assert (row.status, row.attempts) == (Notification.PENDING, 1)
+    assert row.next_attempt_at >= started + N.RETRY_BASE
+    assert "451" in row.last_error
+
+    assert _dispatch(outbox).claimed == 0  # not due yet
+    row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    report = _dispatch(outbox)
+    assert (report.claimed, report.failed) == (1, 1)
+    row = _row("p3@example.test")
+    assert (row.status, row.attempts) == (Notification.FAILED, 2)
+
+
+def test_refused_recipient_keeps_the_pooled_connection(outbox, smtp):
+    smtp.rcpt_replies["p1@example.test"] = "550 no such mailbox"
+    report = _dispatch(outbox, connections=1)
+    assert (report.sent, report.failed) == (4, 1)
+    assert smtp.connections == 1
+
+
+def test_unset_cancels_claimed_messages(outbox, smtp):
+    claimed = N._claim(2)
+    assert len(claimed) == 2
+    unset_and_unlock_assignments(1)
+    assert N.notification_counts(1) == {Notification.CANCELLED: 5}
+    assert _dispatch(outbox).claimed == 0
+    assert smtp.delivered == []
+
+
+def test_cancel_during_a_batch_is_not_overwritten(outbox, smtp, monkeypatch):
+    build = N._build_message
+
+    def cancel_then_build(row):
+        # An admin unsets assignments from another process while this batch is in flight.
+        with db.engine.begin() as conn:
+            conn.execute(db.update(Notification).values(status=Notification.CANCELLED))
+        return build(row)
+
+    monkeypatch.setattr(N, "_build_message", cancel_then_build)
+    _dispatch(outbox)
+    assert N.notification_counts(1) == {Notification.CANCELLED: 5}
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import io
+import logging
+
+import pytest
+from flask import request
+
+from app.extensions import db
+from app.models import Participant
+from app.query_budget import QueryBudgetExceeded, check_statements, statement_shape
+from app.views.public import LandingView
+from conftest import ADMIN, client_hash, login, register
+
+
+# --------- Every view within its budget (SANTA_QUERY_BUDGETS=raise) ----------
+
+def _view_endpoints(app) -> set[str]:
+    return {name for name, view in app.view_functions.items() if getattr(view, "view_class", None)}
+
+
+def _participant_id(app, name: str) -> int:
+    with app.app_context():
+        return db.session.scalar(db.select(Participant.id).where(Participant.name == name))
+
+
+def test_every_view_stays_within_budget(app, client):
+    seen = set()
+
+    @app.after_request
+    def remember(response):
+        seen.add(request.endpoint)
+        return response
+
+    assert client.get("/").status_code == 200
+    assert client.get("/e/default").status_code == 302
+    assert client.get("/auth/register").status_code == 200
+    for name in (ADMIN, "alice", "bob", "carol", "dave"):
+        assert register(client, name).status_code == 302
+    assert client.get("/auth/login").status_code == 200
+    assert client.post("/auth/request-reset", data={"name": "bob"}).status_code == 302
+
+    assert login(client, "alice").status_code == 302
+    assert client.get("/dashboard").status_code == 200
+    assert client.get("/preferences").status_code == 200
+    bob, carol = _participant_id(app, "bob"), _participant_id(app, "carol")
+    assert client.post("/preferences", data={"dont_gift_to": [str(bob)], "dont_receive_from": [str(carol)]}).status_code == 302
+    assert client.get("/auth/change-passphrase").status_code == 200
+    assert client.post("/auth/change-passphrase", data={"client_hash": client_hash("alice")}).status_code == 302
+    assert client.get("/auth/logout").status_code == 302
+
+    assert login(client, ADMIN).status_code == 302
+    assert client.get("/admin/participants").status_code == 200
+    assert client.get("/admin/participants?q=b").status_code == 200
+    assert client.get("/admin/participants/export.csv").status_code == 200
+    assert client.get("/admin/resets").status_code == 200
+    assert client.get(f"/admin/reset-passkey/{bob}").status_code == 200
+    assert client.post(f"/admin/reset-passkey/{bob}", data={"client_hash": "ab" * 32}).status_code == 302
+    assert client.get("/admin/exclusions/export?format=csv").status_code == 200
+    upload = {"file": (io.BytesIO(b"giver,receiver\ndave,carol\ncarol,nobody\n"), "exclusions.csv")}
+    assert client.post("/admin/exclusions/import", data=upload, content_type="multipart/form-data").status_code == 302
+    assert client.get("/admin/run-assignments").status_code == 302
+    assert client.get("/metrics").status_code == 200
+
+    member = app.test_client()
+    login(member, "carol")
+    assert member.get("/my-assignment").status_code == 200
+
+    assert client.post("/admin/unset-assignments").status_code == 302
+    assert client.post(f"/admin/participants/{_participant_id(app, 'dave')}/delete").status_code == 302
+
+    assert _view_endpoints(app) <= seen, f"not exercised: {sorted(_view_endpoints(app) - seen)}"
+
+
+def test_preferences_with_many_choices_is_not_n_plus_one(app, client):
+    register(client, ADMIN)
+    register(client, "alice")
+    with app.app_context():
+        for i in range(60):
+            db.session.add(Participant(event_id=1, name=f"p{i:02}", passkey_hash="x"))
+        db.session.commit()
+        ids = list(db.session.scalars(db.select(Participant.id).where(Participant.name.like("p%"))))
+    login(client, "alice")
+
+    resp = client.post("/preferences", data={"dont_gift_to": [str(i) for i in ids[:40]], "dont_receive_from": [str(i) for i in ids[20:]]})
+    assert resp.status_code == 302
+    assert client.get("/preferences").status_code == 200
+
+    client.get("/auth/logout")
+    login(client, ADMIN)
+    assert client.get("/admin/participants").status_code == 200
+    assert client.get("/admin/run-assignments").status_code == 302
+
+
+# --------- Modes ----------
+
+@pytest.fixture
+def over_budget(monkeypatch):
+    monkeypatch.setattr(LandingView, "query_budget", 0)
+
+
+def test_off_mode_does_not_check(make_app, over_budget, caplog):
+    app = make_app("off")
+    with caplog.at_level(logging.WARNING):
+        assert app.test_client().get("/").status_code == 200
+    assert "Query budget" not in caplog.text
+
+
+def test_warn_mode_logs_and_serves(make_app, over_budget, caplog):
+    app = make_app("warn")
+    with caplog.at_level(logging.WARNING):
+        assert app.test_client().get("/").status_code == 200
+    assert "Query budget: GET public.landing" in caplog.text
+    assert "> budget 0" in caplog.text
+
+
+def test_raise_mode_fails_the_request(make_app, over_budget):
+    app = make_app("raise")
+    with pytest.raises(QueryBudgetExceeded, match=r"GET public.landing: \d+ queries > budget 0"):
+        app.test_client().get("/")
+
+
+def test_unknown_mode_is_rejected(make_app):
+    with pytest.raises(ValueError, match="SANTA_QUERY_BUDGETS"):
+        make_app("loud")
+
+
+# --------- check_statements / statement_shape ----------
+
+def test_statement_shape_folds_literals_and_in_lists():
+    a = statement_shape("SELECT *  FROM participants\nWHERE id IN (?, ?, ?) LIMIT 10")
+    b = statement_shape("SELECT * FROM participants WHERE id IN (?, ?) LIMIT 20")
+    assert a == b == "SELECT * FROM participants WHERE id IN (?) LIMIT ?"
+
+
+def test_check_statements_budget_and_repeats():
+    n_plus_one = ["SELECT * FROM participants WHERE id = ?"] * 4
+    assert check_statements(n_plus_one, budget=10, repeat_limit=4) == []
+    problems = check_statements(n_plus_one, budget=3, repeat_limit=3)
+    assert problems[0] == "4 queries > budget 3"
+    assert problems[1].startswith("same statement x4 (possible N+1)")
+
+
+def test_check_statements_unbounded():
+    statements = ["INSERT INTO exclusions VALUES (?, ?)"] * 50
+    assert check_statements(statements, budget=None, repeat_limit=None) == []
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import Counter
+
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Participant
+from conftest import ADMIN, client_hash, login, register
+
+
+@pytest.fixture
+def replicated(make_app, tmp_path):
+    """Primary + one replica (a copy of the primary taken after setup), with per-engine statement counts."""
+    app = make_app("off", DATABASE_REPLICA_URLS=f"sqlite:///{tmp_path}/replica.db", SANTA_REPLICA_RYW_SECONDS="0.5")
+    client = app.test_client()
+    for name in (ADMIN, "alice", "bob"):
+        register(client, name)
+
+    with app.app_context():
+        db.session.remove()
+        # The backup API copies committed pages out of the WAL too; copying
+        # santa.db alone would give an empty replica.
+        with sqlite3.connect(tmp_path / "santa.db") as src, sqlite3.connect(tmp_path / "replica.db") as dst:
+            src.backup(dst)
+        engines = {"primary": db.engines[None], "replica": db.engines["replica0"]}
+
+    statements: Counter[str] = Counter()
+    for label, engine in engines.items():
+        event.listen(engine, "before_cursor_execute", lambda *args, label=label: statements.update([label]))
+    app.santa_statements = statements
+    return app
+
+
+def _get(client, path: str) -> Counter:
+    statements = client.application.santa_statements
+    statements.clear()
+    assert client.get(path).status_code == 200
+    return Counter(statements)
+
+
+def test_get_reads_from_the_replica(replicated):
+    with replicated.app_context():
+        db.session.add(Participant(event_id=1, name="late", passkey_hash="x"))  # primary only
+        db.session.commit()
+
+    client = replicated.test_client()
+    counts = _get(client, "/")
+    assert counts["replica"] > 0 and counts["primary"] == 0
+    assert "3 participants" in client.get("/").get_data(as_text=True)  # the primary has 4
+
+
+def test_a_write_pins_the_rest_of_the_request_to_the_primary(replicated):
+    with replicated.app_context():
+        db.session.add(Participant(event_id=1, name="late", passkey_hash="x"))  # primary: 4, replica: 3
+        db.session.commit()
+
+    count = db.select(db.func.count(Participant.id))
+    with replicated.test_request_context("/", method="GET"):
+        replicated.preprocess_request()
+        assert db.session.scalar(count) == 3
+        db.session.add(Participant(event_id=1, name="later", passkey_hash="x"))
+        db.session.flush()
+        assert db.session.scalar(count) == 5
+
+
+@pytest.mark.parametrize("write", ["preferences", "passphrase"])
+def test_a_writer_reads_the_primary_for_the_ryw_window(replicated, write):
+    client = replicated.test_client()
+    login(client, "alice")
+    assert _get(client, "/dashboard")["primary"] == 0
+
+    if write == "preferences":
+        with replicated.app_context():
+            bob = db.session.scalar(db.select(Participant.id).where(Participant.name == "bob"))
+        assert client.post("/preferences", data={"dont_gift_to": [str(bob)]}).status_code == 302
+    else:
+        assert client.post("/auth/change-passphrase", data={"client_hash": client_hash("new words")}).status_code == 302
+
+    counts = _get(client, "/dashboard")
+    assert counts["replica"] == 0 and counts["primary"] > 0
+
+    # Someone who didn't write still reads the replica meanwhile.
+    other = replicated.test_client()
+    login(other, "bob")
+    assert _get(other, "/dashboard")["primary"] == 0
+
+    time.sleep(replicated.config["SANTA_REPLICA_RYW_SECONDS"] + 0.1)
+    counts = _get(client, "/dashboard")
+    assert counts["replica"] > 0 and counts["primary"] == 0
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from flask_migrate import upgrade
+
+from app.extensions import db
+from app.models import Exclusion, Participant
+from app.services.assignments import run_and_lock_assignments
+from app.services.events import create_event
+from app.services.snapshots import TABLES, SnapshotError, restore_snapshot, write_snapshot
+
+MIGRATIONS = str(Path(__file__).resolve().parent.parent / "migrations")
+
+
+def _counts() -> dict[str, int]:
+    return {
+        name: db.session.scalar(db.select(db.func.count()).select_from(db.metadata.tables[name]))
+        for name in TABLES
+    }
+
+
+def _participants() -> list[tuple]:
+    return db.session.execute(
+        db.select(Participant.id, Participant.name, Participant.passkey_hash, Participant.assigned_to_ciphertext)
+        .order_by(Participant.id)
+    ).all()
+
+
+@pytest.fixture
+def archive(app):
+    """Snapshot of a database with two events, an exclusion, locked assignments and queued notifications."""
+    app.config["SMTP_HOST"] = "smtp.example.test"  # enqueue only; nothing is sent
+    with app.app_context():
+        for slug in ("office", "family"):
+            event_id = create_event(slug).id
+            people = [
+                Participant(event_id=event_id, name=f"{slug}{i}", email=f"{slug}{i}@example.test", passkey_hash=f"h{i}")
+                for i in range(4)
+            ]
+            db.session.add_all(people)
+            db.session.flush()
+            db.session.add(Exclusion(event_id=event_id, giver_id=people[0].id, receiver_id=people[1].id))
+            db.session.commit()
+            run_and_lock_assignments(event_id)
+
+        buf = io.BytesIO()
+        write_snapshot(buf)
+        return buf.getvalue(), _counts(), _participants()
+
+
+@pytest.fixture
+def migrated(make_app, tmp_path):
+    """A second, empty database set up by `flask db upgrade`."""
+    target = make_app(DATABASE_URL=f"sqlite:///{tmp_path}/target.db")
+    with target.app_context():
+        db.drop_all(bind_key=None)
+        upgrade(directory=MIGRATIONS)
+    return target
+
+
+def test_restore_round_trip(archive, migrated):
+    data, counts, participants = archive
+    assert counts["participants"] == 8 and counts["notifications"] == 8
+
+    with migrated.app_context():
+        report = restore_snapshot(io.BytesIO(data))
+        assert report.tables == counts
+        assert _counts() == counts
+        # Hashes and ciphertexts are carried over byte for byte, ids included.
+        assert _participants() == participants
+
+
+def test_restore_refuses_a_database_with_participants(archive, migrated):
+    with migrated.app_context():
+        db.session.add(Participant(event_id=1, name="early", passkey_hash="x"))
+        db.session.commit()
+
+        with pytest.raises(SnapshotError, match="participants is not empty"):
+            restore_snapshot(io.BytesIO(archive[0]))
+        assert [p.name for p in _participants()] == ["early"]
+
+
+def test_restore_refuses_a_database_with_other_events(archive, migrated):
+    with migrated.app_context():
+        create_event("other")
+
+        with pytest.raises(SnapshotError, match="already has events"):
+            restore_snapshot(io.BytesIO(archive[0]))
+        assert _counts()["events"] == 2